@@ -74,6 +74,26 @@
 #% gisprompt:
 #%end
 
+#%option
+#% key: engine
+#% type: string
+#% description: HANTS implementation used to filter the maps
+#% options: numpy,r.hants
+#% answer: numpy
+#% descriptions: numpy;Built-in vectorized implementation that fits blocks of rows at once;r.hants;Run the r.hants addon on the map list
+#% required: no
+#% multiple: no
+#%end
+
+#%option
+#% key: nrows
+#% type: integer
+#% description: Number of rows that are fitted at once by the numpy engine
+#% answer: 64
+#% required: no
+#% multiple: no
+#%end
+
 #%flag
 #% key: n
 #% description: Register Null maps
@@ -97,8 +117,197 @@
 from __future__ import print_function
 
 import copy
+import numpy as np
 import grass.script as grass
 
+# The null value of CELL maps, FCELL and DCELL maps use NaN
+CELL_NULL = np.iinfo(np.int32).min
+
+
+############################################################################
+
+def hants_matrix(num_times, nf, base_period=None):
+    """Create the design matrix of the harmonic model
+
+    The time steps are the indices of the maps and the base period is the
+    number of maps, which are the defaults of r.hants.
+
+    :param num_times: The number of time steps
+    :param nf: The number of frequencies
+    :param base_period: The length of the base period in time steps
+    :return: The (2 * nf + 1, num_times) design matrix
+    """
+    if base_period is None:
+        base_period = num_times
+    steps = np.arange(num_times, dtype=np.float64)
+    mat = np.ones((2 * nf + 1, num_times))
+    for freq in range(1, nf + 1):
+        angle = 2.0 * np.pi * freq * steps / base_period
+        mat[2 * freq - 1] = np.cos(angle)
+        mat[2 * freq] = np.sin(angle)
+    return mat
+
+
+def hants_fit(values, mat, fet=None, dod=0, low=None, high=None,
+              reject_low=False, reject_high=False, interpolate=False,
+              delta=0.0):
+    """Fit the harmonic model to the time series of many pixels at once
+
+    This is the HANTS algorithm of r.hants, vectorized over pixels. In each
+    iteration the weighted normal equations of all pixels that are not yet
+    ready are solved in a single batched call, the fitted values are compared
+    with the observations and the worst outliers are rejected, until the
+    largest error is below the fit error tolerance or no more values can be
+    rejected.
+
+    :param values: The (pixels, time steps) array of observations,
+                   null values are NaN
+    :param mat: The design matrix created by hants_matrix()
+    :param fet: The fit error tolerance, required if outliers are rejected
+    :param dod: The degree of over-determination
+    :param low: Ignore values below this value
+    :param high: Ignore values above this value
+    :param reject_low: Reject low outliers
+    :param reject_high: Reject high outliers
+    :param interpolate: Set the fitted values before the first and after
+                        the last valid observation to NaN
+    :param delta: Regularization of the amplitudes
+    :return: The (pixels, time steps) array of fitted values, the time series
+             of pixels with too few valid observations are NaN
+    """
+    num_times = values.shape[1]
+    num_coeffs = mat.shape[0]
+    noutmax = num_times - num_coeffs - dod
+
+    valid = np.isfinite(values)
+    with np.errstate(invalid="ignore"):
+        if low is not None:
+            valid &= values >= low
+        if high is not None:
+            valid &= values <= high
+    observations = np.where(valid, values, 0.0)
+    weights = valid.astype(np.float64)
+    nout = num_times - valid.sum(axis=1)
+
+    fitted = np.full(values.shape, np.nan)
+    active = np.flatnonzero(nout <= noutmax)
+    regularization = np.eye(num_coeffs) * delta
+    regularization[0, 0] = 0.0
+    steps = np.arange(num_times)
+
+    for _ in range(num_times):
+        if active.size == 0:
+            break
+        p = weights[active]
+        y = observations[active]
+
+        # The normal equations of all active pixels
+        za = (p * y) @ mat.T
+        a = np.einsum("pn,rn,sn->prs", p, mat, mat) + regularization
+        try:
+            zr = np.linalg.solve(a, za[:, :, np.newaxis])[:, :, 0]
+        except np.linalg.LinAlgError:
+            zr = (np.linalg.pinv(a) @ za[:, :, np.newaxis])[:, :, 0]
+        yr = zr @ mat
+        fitted[active] = yr
+
+        if reject_low and reject_high:
+            diff = np.abs(yr - y)
+        elif reject_low:
+            diff = yr - y
+        elif reject_high:
+            diff = y - yr
+        else:
+            break
+
+        err = p * diff
+        maxerr = err.max(axis=1)
+        ready = (maxerr <= fet) | (nout[active] == noutmax)
+
+        # Reject the values whose error is larger than half of the largest
+        # error, starting with the largest, while the limit is not reached
+        order = np.argsort(-err, axis=1)
+        ranked = np.take_along_axis(err, order, axis=1)
+        reject = ranked > 0.5 * maxerr[:, np.newaxis]
+        reject &= steps < (noutmax - nout[active])[:, np.newaxis]
+        reject[ready] = False
+        pixels, ranks = np.nonzero(reject)
+        weights[active[pixels], order[pixels, ranks]] = 0.0
+        nout[active] += reject.sum(axis=1)
+
+        active = active[~ready]
+
+    if interpolate:
+        first = valid.argmax(axis=1)
+        last = num_times - 1 - valid[:, ::-1].argmax(axis=1)
+        outside = (steps < first[:, np.newaxis]) | (steps > last[:, np.newaxis])
+        fitted[outside] = np.nan
+
+    return fitted
+
+
+def hants_rows(input_names, output_names, nf, mtype, nrows, overwrite=False,
+               **kwargs):
+    """Apply HANTS to all maps, reading and fitting blocks of rows at once
+
+    Only the rows of a single block of all maps are kept in memory.
+
+    :param input_names: The ids of the input maps in temporal order
+    :param output_names: The names of the output maps
+    :param nf: The number of frequencies
+    :param mtype: The map type of the output maps, FCELL or DCELL
+    :param nrows: The number of rows of a block
+    :param overwrite: Overwrite existing output maps
+    :param kwargs: The keyword arguments of hants_fit() except mat
+    """
+    from grass.pygrass.gis.region import Region
+    from grass.pygrass.raster import RasterRow
+    from grass.pygrass.raster.buffer import Buffer
+
+    region = Region()
+    num_times = len(input_names)
+    mat = hants_matrix(num_times, nf)
+
+    input_maps = []
+    for name in input_names:
+        rmap = RasterRow(name)
+        rmap.open("r")
+        input_maps.append(rmap)
+    output_maps = []
+    for name in output_names:
+        rmap = RasterRow(name)
+        rmap.open("w", mtype=mtype, overwrite=overwrite)
+        output_maps.append(rmap)
+
+    block = np.empty((nrows, region.cols, num_times))
+    in_rows = [Buffer(shape=(region.cols,), mtype=rmap.mtype) for rmap in input_maps]
+    out_row = Buffer(shape=(region.cols,), mtype=mtype)
+
+    for start in range(0, region.rows, nrows):
+        usable_rows = min(nrows, region.rows - start)
+        values = block[:usable_rows]
+        for tindex, (rmap, row) in enumerate(zip(input_maps, in_rows)):
+            for n in range(usable_rows):
+                rmap.get_row(start + n, row)
+                values[n, :, tindex] = row
+                if rmap.mtype == "CELL":
+                    values[n, row == CELL_NULL, tindex] = np.nan
+
+        fitted = hants_fit(values.reshape(-1, num_times), mat, **kwargs)
+        fitted = fitted.reshape(usable_rows, region.cols, num_times)
+
+        for tindex, rmap in enumerate(output_maps):
+            for n in range(usable_rows):
+                out_row[:] = fitted[n, :, tindex]
+                rmap.put_row(out_row)
+
+        grass.percent(start + usable_rows, region.rows, 1)
+
+    for rmap in input_maps:
+        rmap.close()
+    for rmap in output_maps:
+        rmap.close()
+
 
 ############################################################################
 
@@ -131,49 +340,82 @@ def main():
 
     new_sp = tgis.check_new_stds(output, "strds", dbif=dbif,
                                                overwrite=overwrite)
-    # Configure the HANTS module
-    hants_flags = ""
-    if flags["l"]:
-        hants_flags = hants_flags + 'l'
-    if flags["h"]:
-        hants_flags = hants_flags + 'h'
-    if flags["i"]:
-        hants_flags = hants_flags + 'i'
-
-    kwargs = dict()
-    kwargs['nf'] = options['nf']
-    if options['fet']:
-        kwargs['fet'] = options['fet']
-    kwargs['dod'] = options['dod']
-    if options['range']:
-        kwargs['range'] = options['range']
-    kwargs['suffix'] = "_hants"
-    if len(hants_flags) > 0:
-        kwargs['flags'] = hants_flags
 
-    count = 0
-    num_maps = len(maps)
-    new_maps = []
+    engine = options["engine"]
+    nf = int(options["nf"])
+    dod = int(options["dod"])
+    fet = float(options["fet"]) if options["fet"] else None
+    low = high = None
+    if options["range"]:
+        low, high = [float(value) for value in options["range"].split(",")]
 
-    maplistfile = script.tempfile()
-    fd = open(maplistfile, 'w')
+    num_maps = len(maps)
+    if 2 * nf + 1 > num_maps:
+        dbif.close()
+        grass.fatal(_("The maximum number of frequencies for %i maps is %i")
+                    % (num_maps, (num_maps - 1) // 2))
+    if num_maps - 2 * nf - 1 - dod < 0:
+        dbif.close()
+        grass.fatal(_("The degree of over-determination can be at most %i")
+                    % (num_maps - 2 * nf - 1))
+    if (flags["l"] or flags["h"]) and fet is None:
+        dbif.close()
+        grass.fatal(_("The fit error tolerance is required to reject outliers"))
 
-    # create list of input maps and their time stamps
+    new_maps = []
     for map in maps:
-        count += 1
-        map_name = "{ba}_hants".format(ba=map.get_id())
+        # r.hants creates the maps in the current mapset with the suffix
+        map_name = "{ba}_hants".format(ba=map.get_name())
 
         new_map = tgis.open_new_map_dataset(map_name, None, type="raster",
                                             temporal_extent=map.get_temporal_extent(),
                                             overwrite=overwrite, dbif=dbif)
         new_maps.append(new_map)
 
-        f.write("{0}\n".format(map.get_id()))
-
-    f.close()
-
-    # run r.hants
-    grass.run_command('r.hants', file=maplistfile, suffix="_hants", quiet=True, **kwargs)
+    if engine == "numpy":
+        nrows = int(options["nrows"])
+        if nrows < 1:
+            dbif.close()
+            grass.fatal(_("The number of rows must be positive"))
+
+        mtype = "FCELL"
+        if any(map.metadata.get_datatype() == "DCELL" for map in maps):
+            mtype = "DCELL"
+
+        hants_rows([map.get_id() for map in maps],
+                   [map.get_name() for map in new_maps], nf=nf,
+                   mtype=mtype, nrows=nrows, overwrite=overwrite, fet=fet,
+                   dod=dod, low=low, high=high, reject_low=flags["l"],
+                   reject_high=flags["h"], interpolate=flags["i"])
+    else:
+        # Configure the HANTS module
+        hants_flags = ""
+        if flags["l"]:
+            hants_flags = hants_flags + 'l'
+        if flags["h"]:
+            hants_flags = hants_flags + 'h'
+        if flags["i"]:
+            hants_flags = hants_flags + 'i'
+
+        kwargs = dict()
+        kwargs['nf'] = options['nf']
+        if options['fet']:
+            kwargs['fet'] = options['fet']
+        kwargs['dod'] = options['dod']
+        if options['range']:
+            kwargs['range'] = options['range']
+        if len(hants_flags) > 0:
+            kwargs['flags'] = hants_flags
+
+        # create list of input maps
+        maplistfile = grass.tempfile()
+        with open(maplistfile, 'w') as f:
+            for map in maps:
+                f.write("{0}\n".format(map.get_id()))
+
+        # run r.hants
+        grass.run_command('r.hants', file=maplistfile, suffix="_hants",
+                          quiet=True, overwrite=overwrite, **kwargs)
 
     # Open the new space time raster dataset
     ttype, stype, title, descr = sp.get_initial_values()
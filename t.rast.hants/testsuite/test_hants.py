@@ -0,0 +1,164 @@
+"""Test the numpy HANTS engine of t.rast.hants and compare it with r.hants
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Markus Metz
+"""
+import os
+import time
+import unittest
+import grass.temporal as tgis
+import grass.script as gcore
+from grass.gunittest.case import TestCase
+
+NUM_MAPS = 12
+HAS_RHANTS = bool(gcore.find_program("r.hants", "--help"))
+
+
+def create_strds(name, prefix, seed=0):
+    """Create a STRDS of a yearly cycle with nulls and low outliers
+
+    The phase of the cycle depends on the column, the amplitude on the row.
+
+    :param name: The name of the STRDS
+    :param prefix: The prefix of the map names
+    :param seed: The seed of the noise
+    :return: The list of map names
+    """
+    maps = []
+    for count in range(NUM_MAPS):
+        map_name = "%s_%i" % (prefix, count)
+        cycle = "50 + row() * sin(%i + col() * 10)" % (count * 360 // NUM_MAPS)
+        expression = "%s = if(rand(0, 1.0) < 0.1, null(), if(rand(0, 1.0) < 0.1, %s - 40, %s)) " \
+                     "+ rand(-1.0, 1.0)" % (map_name, cycle, cycle)
+        TestCase.runModule("r.mapcalc", expression=expression, seed=seed + count, overwrite=True)
+        maps.append(map_name)
+
+    TestCase.runModule("t.create", type="strds", temporaltype="absolute", output=name,
+                       title="HANTS test", description="HANTS test", overwrite=True)
+    TestCase.runModule("t.register", flags="i", type="raster", input=name, maps=",".join(maps),
+                       start="2001-01-01", increment="1 month", overwrite=True)
+    return maps
+
+
+class TestHants(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, res=10)
+        cls.maps = create_strds("A", "a")
+        for count in range(NUM_MAPS):
+            cls.runModule("r.mapcalc", expression="c_%i = 50 + row() * sin(%i + col() * 10)"
+                          % (count, count * 360 // NUM_MAPS), overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="C", title="Cycle",
+                      description="Cycle", overwrite=True)
+        cls.runModule("t.register", flags="i", type="raster", input="C",
+                      maps=",".join("c_%i" % count for count in range(NUM_MAPS)),
+                      start="2001-01-01", increment="1 month", overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A,B,C")
+        cls.runModule("g.remove", flags="f", type="raster", pattern="*_np")
+
+    def copy_results(self, prefix, suffix):
+        """Copy the result maps, they are overwritten by the next run"""
+        for count in range(NUM_MAPS):
+            name = "%s_%i_hants" % (prefix, count)
+            self.runModule("g.copy", raster=(name, name + suffix), overwrite=True)
+
+    def test_harmonic_cycle(self):
+        """A single harmonic is reproduced exactly"""
+        self.assertModule("t.rast.hants", input="C", output="B", nf=1, overwrite=True)
+        for count in range(NUM_MAPS):
+            self.assertRastersNoDifference(actual="c_%i_hants" % count, reference="c_%i" % count,
+                                           precision=0.001)
+
+    def test_block_rows(self):
+        """The result does not depend on the number of rows of a block"""
+        self.assertModule("t.rast.hants", input="A", output="B", nf=2, fet=2, dod=1,
+                          range=(0, 200), flags="li", nrows=64, overwrite=True)
+        self.copy_results("a", "_np")
+        self.assertModule("t.rast.hants", input="A", output="B", nf=2, fet=2, dod=1,
+                          range=(0, 200), flags="li", nrows=3, overwrite=True)
+        for name in self.maps:
+            self.assertRastersNoDifference(actual=name + "_hants", reference=name + "_hants_np",
+                                           precision=0.000001)
+
+    def test_outlier_rejection(self):
+        """Rejecting low outliers moves the fit towards the cycle"""
+        self.assertModule("t.rast.hants", input="A", output="B", nf=1, overwrite=True)
+        self.copy_results("a", "_np")
+        self.assertModule("t.rast.hants", input="A", output="B", nf=1, fet=2, flags="l", overwrite=True)
+        for count in range(NUM_MAPS):
+            self.runModule("r.mapcalc", expression="d_np = abs(a_%i_hants - c_%i) - abs(a_%i_hants_np - c_%i)"
+                           % (count, count, count, count), overwrite=True)
+            stats = gcore.parse_command("r.univar", flags="g", map="d_np")
+            self.assertLess(float(stats["mean"]), 0)
+
+    @unittest.skipIf(not HAS_RHANTS, "r.hants is not installed")
+    def test_compare_r_hants(self):
+        """The numpy engine computes the same maps as r.hants"""
+        for hants_flags in ("", "l", "lh", "li"):
+            self.assertModule("t.rast.hants", input="A", output="B", nf=2, fet=2, dod=1,
+                              range=(0, 200), flags=hants_flags, engine="numpy", overwrite=True)
+            self.copy_results("a", "_np")
+            self.assertModule("t.rast.hants", input="A", output="B", nf=2, fet=2, dod=1,
+                              range=(0, 200), flags=hants_flags, engine="r.hants", overwrite=True)
+            for name in self.maps:
+                self.assertRastersNoDifference(actual=name + "_hants_np", reference=name + "_hants",
+                                               precision=0.001)
+
+
+class BenchmarkHants(TestCase):
+    """Compare the run time of the numpy engine with r.hants on a larger region"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=300, w=0, e=400, res=1)
+        create_strds("BENCH", "bench", seed=100)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="BENCH,B")
+
+    def test_benchmark(self):
+        """Time both engines with outlier rejection"""
+        start = time.perf_counter()
+        self.assertModule("t.rast.hants", input="BENCH", output="B", nf=2, fet=2, dod=1,
+                          flags="l", engine="numpy", overwrite=True)
+        numpy_seconds = time.perf_counter() - start
+        print("numpy engine: %.3f seconds" % numpy_seconds)
+
+        if HAS_RHANTS:
+            start = time.perf_counter()
+            self.assertModule("t.rast.hants", input="BENCH", output="B", nf=2, fet=2, dod=1,
+                              flags="l", engine="r.hants", overwrite=True)
+            rhants_seconds = time.perf_counter() - start
+            print("r.hants engine: %.3f seconds" % rhants_seconds)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -32,94 +32,696 @@
 #%end
 
 #%option G_OPT_STRDS_OUTPUT
+#%multiple: yes
+#%description: Name of the output space time raster datasets, one for each resulting data cube in order
 #%end
 
 #%option G_OPT_R_OUTPUT
 #%key: basename
-#%description: The basename of the output raster maps
+#%multiple: yes
+#%description: The basename of the output raster maps, one for each output space time raster dataset
 #%end
 
 #%option G_OPT_F_INPUT
 #%key: pyfile
+#%required: no
 #%description: The Python file with user defined function to apply to the input STRDS and create an output raster map
 #%end
 
+#%option
+#%key: reducer
+#%type: string
+#%description: Reduce the time axis of each input STRDS with a built-in function instead of running a user defined function
+#%options: sum,mean,max,min,median
+#%required: no
+#%multiple: no
+#%end
+
 #%option
 #%key: nrows
 #%type: integer
-#%description: Number of rows that should be provided at once to the user defined function
+#%description: Number of rows that should be provided at once to the user defined function, ignored in tile mode
 #%required: no
 #%multiple: no
 #%answer: 1
 #%end
 
+#%option
+#%key: memory
+#%type: integer
+#%description: Memory budget for the data cubes in MB, the number of rows of the blocks is computed from it if set
+#%required: no
+#%multiple: no
+#%end
+
+#%option
+#%key: tilecols
+#%type: integer
+#%description: Number of columns of the tiles that should be provided at once to the user defined function, 0 provides full rows
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
+#%option
+#%key: tilerows
+#%type: integer
+#%description: Number of rows of the tiles, defaults to tilecols if only tilecols is set
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
+#%option
+#%key: maxopen
+#%type: integer
+#%description: Maximum number of input raster maps that are open at the same time, 0 keeps all input maps open
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
+#%option
+#%key: window
+#%type: integer
+#%description: Number of consecutive maps of the temporal windows that are provided to the user defined function, 0 provides all maps at once
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
+#%option
+#%key: step
+#%type: integer
+#%description: Number of maps the temporal window is moved forward between two windows
+#%required: no
+#%multiple: no
+#%answer: 1
+#%end
+
+#%option
+#%key: nslices
+#%type: integer
+#%description: Number of slices the user defined function returns for each output, if 0 the function is probed with the first block
+#%required: no
+#%multiple: yes
+#%answer: 0
+#%end
+
+#%option
+#%key: ctype
+#%type: string
+#%description: Map type of the data cubes the user defined function computes with, the map type of the input maps if not set
+#%options: CELL,FCELL,DCELL
+#%required: no
+#%multiple: no
+#%end
+
+#%option
+#%key: mtype
+#%type: string
+#%description: Map type of the output raster maps, the map type of the data cubes if not set
+#%options: CELL,FCELL,DCELL
+#%required: no
+#%multiple: no
+#%end
+
+#%option
+#%key: engine
+#%type: string
+#%description: Execution engine of the UDF
+#%options: compiled,openeo
+#%descriptions: compiled;Compile the UDF code once and call the UDF function for each block;openeo;Run the UDF code with the openEO UDF API for each block
+#%answer: compiled
+#%required: no
+#%multiple: no
+#%end
+
+#%option
+#%key: nprocs
+#%type: integer
+#%description: Number of processes that run the user defined function on row blocks in parallel
+#%required: no
+#%multiple: no
+#%answer: 1
+#%end
+
+#%option
+#%key: service
+#%type: string
+#%key_desc: name
+#%required: no
+#%multiple: no
+#%description: Unix socket of the UDF service to run the user defined function in, it is run in this process if the service is not running
+#%end
+
+#%option
+#%key: checkpoint
+#%type: string
+#%key_desc: name
+#%required: no
+#%multiple: no
+#%description: Directory in which the completed row blocks are saved, an interrupted job with the same options is resumed from it
+#%end
+
+#%option
+#%key: interval
+#%type: double
+#%description: Minimum number of seconds between two saved checkpoints
+#%required: no
+#%multiple: no
+#%answer: 10
+#%end
+
+#%option
+#%key: cache
+#%type: string
+#%key_desc: name
+#%required: no
+#%multiple: no
+#%description: Directory of the on-disk cache of the data cubes of the input STRDS, repeated runs for the same maps and region read the cached cubes
+#%end
+
+#%option
+#%key: cachesize
+#%type: integer
+#%description: Maximum size of the cube cache in MB, the least recently used cubes are removed
+#%required: no
+#%multiple: no
+#%answer: 4096
+#%end
+
+#%option G_OPT_V_INPUT
+#%key: aoi
+#%required: no
+#%description: Vector map of the area of interest, only blocks that intersect it are processed
+#%end
+
+#%option G_OPT_R_INPUT
+#%key: aoiraster
+#%required: no
+#%description: Raster map of the area of interest, only blocks that intersect its non-null cells are processed
+#%end
+
+#%option
+#%key: bbox
+#%type: double
+#%key_desc: n,s,e,w
+#%description: Bounding box of the area of interest, only blocks that intersect it are processed
+#%required: no
+#%end
+
+#%option
+#%key: coordinator
+#%type: string
+#%key_desc: host:port
+#%required: no
+#%multiple: no
+#%description: Address of the coordinator that distributes row ranges of the region to worker processes
+#%end
+
+#%option
+#%key: workers
+#%type: integer
+#%description: Number of local worker processes the coordinator starts
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
+#%option
+#%key: taskrows
+#%type: integer
+#%description: Number of rows of the row ranges the coordinator distributes, 0 computes it from the number of rows and workers
+#%required: no
+#%multiple: no
+#%answer: 0
+#%end
+
 #%option G_OPT_T_WHERE
 #%end
+
+#%option G_OPT_F_OUTPUT
+#%key: profile
+#%required: no
+#%description: Name of the JSON file to write the time and throughput of the processing stages to
+#%end
+
+#%option G_OPT_F_OUTPUT
+#%key: trace
+#%required: no
+#%description: Name of the Chrome trace event file to write the timing of all stage calls to
+#%end
+
+#%flag
+#%key: i
+#%description: Print the metadata of the generated raster maps
+#%end
+
+#%flag
+#%key: n
+#%description: Do not run the user defined function for blocks in which all input cells are null, write null cells instead
+#%end
+
+#%flag
+#%key: p
+#%description: Pipeline the processing: read the next blocks and write the results in background threads
+#%end
+
+#%flag
+#%key: s
+#%description: Start the UDF service at the service socket and run the user defined functions submitted to it until interrupted
+#%suppress_required: yes
+#%end
+
+#%flag
+#%key: w
+#%description: Run as worker of the coordinator and process the row ranges it distributes until it stops
+#%suppress_required: yes
+#%end
+
+#%flag
+#%key: r
+#%description: Write the output raster maps only, without registering them in the output space time raster datasets
+#%end
+
+#%rules
+#%required: pyfile,reducer,-s,-w
+#%exclusive: pyfile,reducer
+#%exclusive: aoi,aoiraster,bbox
+#%end
+from __future__ import annotations
+
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from functools import partial
 from datetime import datetime
-from pandas import DatetimeIndex
-import geopandas
-import pandas
-import numpy
-import xarray
-from shapely.geometry import Polygon, Point
+import hashlib
+from itertools import chain
+from multiprocessing import get_context
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import inspect
+import math
+import os
+import queue
+import secrets
+import socket
+import subprocess
+import threading
+import time
+import traceback
+import warnings
 import json
-import sys
 from typing import Optional, List, Dict, Tuple
 import numpy as np
 
-from openeo_udf.api.datacube import DataCube
-from openeo_udf.api.udf_data import UdfData
-from openeo_udf.api.run_code import run_user_code
-
-from grass.temporal import RasterDataset, SpaceTimeRasterDataset, SQLDatabaseInterfaceConnection, open_new_stds, register_map_object_list
+from grass.temporal import RasterDataset, SpaceTimeRasterDataset, SQLDatabaseInterfaceConnection, open_new_stds
 import grass.temporal as tgis
 import grass.script as gcore
 from grass.pygrass.raster import RasterRow
 from grass.pygrass.raster.buffer import Buffer
 from grass.pygrass.gis.region import Region
 from grass.pygrass.raster.raster_type import TYPE as RTYPE
+import grass.lib.raster as libraster
+
+
+def import_udf_modules():
+    """Import the modules that are needed to create the data cubes and run the UDF
+
+    Pandas, xarray and the openEO UDF API take most of the startup time. They are
+    imported after the options were parsed and only if the UDF is run in this process.
+    """
+    global pandas, xarray, DatetimeIndex, DataCube, UdfData, run_user_code
+
+    import pandas
+    import xarray
+    from pandas import DatetimeIndex
+    from openeo_udf.api.datacube import DataCube
+    from openeo_udf.api.udf_data import UdfData
+    from openeo_udf.api.run_code import run_user_code
+
+
+# The null value of CELL maps, FCELL and DCELL maps use NaN
+CELL_NULL = np.iinfo(np.int32).min
+
+
+def null_value(mtype: str):
+    """Return the null value of a map type"""
+    if mtype == "CELL":
+        return CELL_NULL
+    return np.nan
+
+
+def is_null(array: np.ndarray, mtype: str) -> bool:
+    """Check if all cells of an array are null
+
+    :param array: The array of the cells
+    :param mtype: The map type of the cells
+    :return: True if all cells are null
+    """
+    if array.size == 0:
+        return True
+
+    # Most blocks with data are rejected by their first cell
+    if mtype == "CELL":
+        return bool(array.flat[0] == CELL_NULL) and bool((array == CELL_NULL).all())
+    return bool(np.isnan(array.flat[0])) and bool(np.isnan(array).all())
+
+
+class Profiler:
+    """Collect the time spent in the stages of the processing and the amount of data processed
+
+    The stages are "read", "cube", "udf" or "reduce", "write" and "register". Stages that run in
+    background threads or worker processes overlap, hence the sum of the stage times
+    may exceed the wall time. If tracing is enabled, each stage call is recorded as
+    a complete event of the Chrome trace event format.
+    """
+
+    def __init__(self, trace: bool = False):
+
+        self.lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.stages: Dict[str, Dict] = {}
+        self.events: Optional[List[Dict]] = [] if trace else None
+
+    @contextmanager
+    def stage(self, name: str, nbytes: int = 0, rows: int = 0):
+        """Measure the time of a stage call
+
+        :param name: The name of the stage
+        :param nbytes: The number of bytes processed by the call
+        :param rows: The number of rows processed by the call
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name=name, start=start, end=time.perf_counter(), nbytes=nbytes, rows=rows)
+
+    def add(self, name: str, start: float, end: float, nbytes: int = 0, rows: int = 0,
+            pid: Optional[int] = None, tid: Optional[int] = None):
+        """Add a stage call
+
+        :param name: The name of the stage
+        :param start: The perf_counter() time at which the call started
+        :param end: The perf_counter() time at which the call ended
+        :param nbytes: The number of bytes processed by the call
+        :param rows: The number of rows processed by the call
+        :param pid: The id of the process of the call, this process if None
+        :param tid: The id of the thread of the call, the current thread if None
+        """
+        with self.lock:
+            stats = self.stages.setdefault(name, {"calls": 0, "seconds": 0.0, "bytes": 0, "rows": 0})
+            stats["calls"] += 1
+            stats["seconds"] += end - start
+            stats["bytes"] += nbytes
+            stats["rows"] += rows
+
+            if self.events is not None:
+                self.events.append({"name": name, "ph": "X",
+                                    "ts": (start - self.start) * 1e6, "dur": (end - start) * 1e6,
+                                    "pid": pid if pid is not None else os.getpid(),
+                                    "tid": tid if tid is not None else threading.get_ident(),
+                                    "args": {"bytes": nbytes, "rows": rows}})
+
+    def summary(self) -> Dict:
+        """Return the summary of the stages with their throughput"""
+        stages = {}
+        for name, stats in self.stages.items():
+            stats = dict(stats)
+            seconds = stats["seconds"]
+            stats["mb_per_second"] = stats["bytes"] / 1024.0 / 1024.0 / seconds if seconds > 0 else None
+            stats["rows_per_second"] = stats["rows"] / seconds if seconds > 0 else None
+            stages[name] = stats
+
+        return {"wall_seconds": time.perf_counter() - self.start, "stages": stages}
+
+    def write_summary(self, filename: str, **info):
+        """Write the summary as JSON file
+
+        :param filename: The name of the JSON file
+        :param info: Additional entries of the summary
+        """
+        summary = self.summary()
+        summary.update(info)
+        with open(filename, "w") as summary_file:
+            json.dump(summary, summary_file, indent=2)
+
+    def write_trace(self, filename: str):
+        """Write the recorded stage calls as Chrome trace file
+
+        :param filename: The name of the trace file
+        """
+        with open(filename, "w") as trace_file:
+            json.dump({"traceEvents": self.events or [], "displayTimeUnit": "ms"}, trace_file)
+
+
+class BlockBuffer:
+    """A reusable (t, y, x) array into which raster rows are read in place
+
+    For each (t, y) row of the array a pygrass Buffer is created that shares the
+    memory of the array, so that Rast_get_row() writes directly into the cube
+    without any intermediate row allocation or copy.
+    """
+
+    def __init__(self, ntimes: int, nrows: int, ncols: int, mtype: str):
+
+        self.nrows = nrows
+        self.ncols = ncols
+        self.mtype = mtype
+        self.array = np.empty(shape=(ntimes, nrows, ncols), dtype=RTYPE[mtype]['numpy'])
+
+        row_bytes = ncols * self.array.itemsize
+        self.rows = [[Buffer(shape=(ncols,), mtype=mtype, buffer=self.array,
+                             offset=(tindex * nrows + n) * row_bytes)
+                      for n in range(nrows)]
+                     for tindex in range(ntimes)]
+
+    def view(self, usable_rows: int, usable_cols: Optional[int] = None) -> np.ndarray:
+        """Return the (t, y, x) view of the first usable_rows rows and usable_cols columns of the buffer"""
+        if usable_cols is None:
+            usable_cols = self.ncols
+        return self.array[:, :usable_rows, :usable_cols]
+
+
+class RegionGrid:
+    """The cell center coordinates of the region, computed once for all blocks
+
+    The coordinates of a block are views of the coordinate vectors.
+    """
+
+    def __init__(self, region: Region):
+
+        self.xcoords = region.west + (np.arange(region.cols) + 0.5) * region.ewres
+        self.ycoords = region.north - (np.arange(region.rows) + 0.5) * region.nsres
+
+
+class RasterHandlePool:
+    """A bounded pool of open input raster maps
+
+    The maps are opened on first access. If more than maxopen maps are open, the
+    least recently used map is closed, so that the number of open file descriptors
+    does not depend on the number of input maps. A maxopen of 0 keeps all maps open.
+    """
+
+    def __init__(self, maxopen: int = 0):
+
+        self.maxopen = maxopen
+        self.handles: "OrderedDict[str, RasterRow]" = OrderedDict()
+        self.num_opened = 0
+
+    def get(self, map_id: str) -> RasterRow:
+        """Return the open raster map with the given id
+
+        :param map_id: The id of the raster map
+        :return: The raster map opened for reading
+        """
+        rmap = self.handles.get(map_id)
+        if rmap is not None:
+            self.handles.move_to_end(map_id)
+            return rmap
+
+        rmap = RasterRow(map_id)
+        rmap.open(mode='r')
+        self.handles[map_id] = rmap
+        self.num_opened += 1
+
+        if 0 < self.maxopen < len(self.handles):
+            lru_id, lru_map = self.handles.popitem(last=False)
+            lru_map.close()
+
+        return rmap
+
+    def close(self):
+        """Close all open raster maps"""
+        for rmap in self.handles.values():
+            rmap.close()
+        self.handles.clear()
 
 
 class StrdsEntry:
 
     def __init__(self, dbif: SQLDatabaseInterfaceConnection, strds: SpaceTimeRasterDataset,
-                 map_list: List[RasterDataset], region:Region, open_input_maps: List[RasterRow] = [],
-                 start_times=[], end_times=[], mtype=None):
+                 map_list: List[RasterDataset], region:Region, handles: Optional[RasterHandlePool] = None,
+                 start_times=None, end_times=None, mtype=None, nrows: int = 1, ncols: Optional[int] = None,
+                 grid: Optional[RegionGrid] = None, ctype: Optional[str] = None):
 
         self.dbif = dbif
         self.strds = strds
         self.map_list = map_list
         self.region = region
-        self.open_input_maps = open_input_maps
-        self.start_times = start_times
-        self.end_times = end_times
-        self.dt_start_times: Optional[DatetimeIndex] = None
-        self.dt_end_times: Optional[DatetimeIndex] = None
+        self.handles = handles if handles is not None else RasterHandlePool()
+        self.map_ids = [map.get_id() for map in map_list]
+        self.reverse = False
+        self.duplicate_of: Optional[int] = None
+        self.start_times = start_times if start_times is not None else []
+        self.end_times = end_times if end_times is not None else []
+        self._dt_start_times: Optional[DatetimeIndex] = None
+        self._dt_end_times: Optional[DatetimeIndex] = None
         self.mtype = mtype
+        # The map type of the block buffers and data cubes, the map type of the maps if None
+        self.ctype = ctype
+        self.nrows = nrows
+        self.ncols = ncols if ncols is not None else region.cols
+        self.grid = grid if grid is not None else RegionGrid(region)
+        self.buffer: Optional[BlockBuffer] = None
+        self.free_buffers: List[BlockBuffer] = []
+        # The full width band of rows from which the tiles of a band are copied
+        self.band: Optional[BlockBuffer] = None
+        self.band_index: Optional[int] = None
+        self.band_maps: set = set()
+        self.cube: Optional[np.ndarray] = None
+        self.window = (0, len(map_list))
+
+    def acquire_buffer(self) -> BlockBuffer:
+        """Return a free block buffer of this STRDS, a new one is allocated if none is available
+
+        Buffers are only acquired by the reading thread, hence popping from the list
+        is safe while the writing thread releases buffers.
+        """
+        if self.free_buffers:
+            return self.free_buffers.pop()
+        return BlockBuffer(ntimes=len(self.map_list), nrows=self.nrows,
+                           ncols=self.ncols, mtype=self.ctype)
+
+    def release_buffer(self, buffer: BlockBuffer):
+        """Give a block buffer back, so that it can be reused for another block"""
+        self.free_buffers.append(buffer)
+
+    def read_block(self, index: int, usable_rows: int, buffer: Optional[BlockBuffer] = None,
+                   col: int = 0, usable_cols: Optional[int] = None,
+                   shared: Optional[Dict[Tuple[str, str], np.ndarray]] = None) -> np.ndarray:
+        """Read usable_rows rows of all maps starting at row index into a block buffer
+
+        The rows are read by Rast_get_row() directly into the reusable (t, y, x) buffer
+        of this STRDS, or into the provided buffer. The returned array is a view of that
+        buffer and is overwritten by the next read into the same buffer.
+
+        Tiles that do not cover the full width of the region are copied from a full width
+        band buffer, into which the rows of each map are decoded once for all tiles of the
+        band. The tiles must be read band by band.
+
+        Maps that were already read for the same block by another STRDS are copied from
+        the shared dictionary instead of being read again.
+
+        :param index: The index of the first row to read
+        :param usable_rows: The number of rows to read
+        :param buffer: The block buffer to read into, a full width default buffer of this STRDS is used if None
+        :param col: The index of the first column to read
+        :param usable_cols: The number of columns to read, the full width of the region if None
+        :param shared: The dictionary of the (y, x) arrays of the maps read for this block,
+                       with (map id, map type) keys, that is updated with the maps read
+        :return: The (t, y, x) array view of the block
+        """
+        if usable_cols is None:
+            usable_cols = self.region.cols
+        if shared is None:
+            shared = {}
+
+        # The block of a cached cube is a view of the memory mapped cube
+        if self.cube is not None:
+            return self.cube[self.window[0]:self.window[1], index:index + usable_rows, col:col + usable_cols]
+
+        if buffer is None:
+            if self.buffer is None or self.buffer.nrows < usable_rows:
+                self.buffer = BlockBuffer(ntimes=len(self.map_list), nrows=usable_rows,
+                                          ncols=self.region.cols, mtype=self.ctype)
+            buffer = self.buffer
+
+        # The maps are read in alternating order, so that a bounded pool of open maps
+        # reuses the most recently opened maps at the start of the next block
+        tindices = range(len(self.map_ids))
+        if self.reverse:
+            tindices = reversed(tindices)
+        self.reverse = not self.reverse
+
+        full_rows = usable_cols == self.region.cols and buffer.ncols == self.region.cols
+        if not full_rows:
+            if self.band is None or self.band.nrows < usable_rows:
+                self.band = BlockBuffer(ntimes=len(self.map_list), nrows=max(self.nrows, usable_rows),
+                                        ncols=self.region.cols, mtype=self.ctype)
+                self.band_index = None
+            if self.band_index != index:
+                self.band_index = index
+                self.band_maps = set()
+
+        for tindex in tindices:
+            map_id = self.map_ids[tindex]
+            target = buffer.array[tindex, :usable_rows, :usable_cols]
+
+            key = (map_id, self.ctype)
+            if key in shared:
+                np.copyto(target, shared[key])
+                continue
+
+            if full_rows:
+                rmap = self.handles.get(map_id)
+                rows = buffer.rows[tindex]
+                for n in range(usable_rows):
+                    self.get_row(rmap, index + n, rows[n])
+            else:
+                if tindex not in self.band_maps:
+                    rmap = self.handles.get(map_id)
+                    rows = self.band.rows[tindex]
+                    for n in range(usable_rows):
+                        self.get_row(rmap, index + n, rows[n])
+                    self.band_maps.add(tindex)
+                np.copyto(target, self.band.array[tindex, :usable_rows, col:col + usable_cols])
+            shared[key] = target
+
+        return buffer.view(usable_rows, usable_cols)
+
+    def get_row(self, rmap: RasterRow, index: int, row: Buffer):
+        """Read a row of a map into a buffer of the map type of the data cubes
+
+        Rows of maps of another map type are converted by Rast_get_row(),
+        null cells are converted to the null value of the data cubes.
+
+        :param rmap: The open raster map
+        :param index: The index of the row
+        :param row: The row buffer
+        """
+        if self.ctype == rmap.mtype:
+            rmap.get_row(index, row)
+        else:
+            libraster.Rast_get_row(rmap._fd, row.p, index, RTYPE[self.ctype]['grass type'])
 
     def to_datacube(self, index: int, usable_rows: int) -> DataCube:
 
-        array = np.ndarray(shape=[len(self.map_list), usable_rows,
-                                  self.region.cols],
-                           dtype=RTYPE[self.mtype]['numpy'])
-
         # We support the reading of several rows for a single udf execution
-        for rmap, tindex in zip(self.open_input_maps, range(len(self.map_list))):
-            for n in range(usable_rows):
-                row = rmap[index + n]
-                array[tindex][n][:] = row[:]
+        array = self.read_block(index=index, usable_rows=usable_rows)
 
-        datacube = self.create_datacube(id=self.strds.get_id(), region=self.region, array=array,
+        datacube = self.create_datacube(id=self.strds.get_id(), grid=self.grid, array=array,
                                         usable_rows=usable_rows, index=index,
                                         start_times=self.dt_start_times, end_times=self.dt_end_times)
         return datacube
 
     def setup(self):
-        """Open all input raster maps, generate the time vectors and return them with the map type as tuple
+        """Open all input raster maps to check their map type and generate the time vectors
 
-        :param map_list:
-        :param dbif:
-        :return:
+        The maps are opened through the pool of open raster maps, which may close
+        them again if its size is bounded.
         """
         print("Setup strds", self.strds.get_id())
         self.start_times = []
@@ -131,23 +733,65 @@ class StrdsEntry:
             self.start_times.append(start)
             self.end_times.append(end)
 
-            rmap = RasterRow(map.get_id())
-            rmap.open(mode='r')
+            rmap = self.handles.get(map.get_id())
             if self.mtype is not None:
                 if self.mtype != rmap.mtype:
                     self.dbif.close()
                     gcore.fatal(_("Space time raster dataset <%s> is contains map with different type. "
-                                  "This is not supported.") % input)
+                                  "This is not supported.") % self.strds.get_id())
 
             self.mtype = rmap.mtype
-            self.open_input_maps.append(rmap)
 
-        self.dt_start_times = DatetimeIndex(self.start_times)
-        self.dt_end_times = DatetimeIndex(self.end_times)
+        if self.ctype is None:
+            self.ctype = self.mtype
+
+        self._dt_start_times = None
+        self._dt_end_times = None
+
+        self.all_map_list = self.map_list
+        self.all_start_times = self.start_times
+        self.all_end_times = self.end_times
+
+    def set_window(self, start: int, stop: int):
+        """Restrict the maps that are read to a temporal window of the maps ordered by start time
+
+        The block buffers of this STRDS are reused for all windows of the same size.
+
+        :param start: The index of the first map of the window
+        :param stop: The index after the last map of the window
+        """
+        if len(self.map_list) != stop - start:
+            self.free_buffers = []
+            self.buffer = None
+            self.band = None
+        self.band_index = None
+
+        self.window = (start, stop)
+        self.map_list = self.all_map_list[start:stop]
+        self.map_ids = [map.get_id() for map in self.map_list]
+        self.start_times = self.all_start_times[start:stop]
+        self.end_times = self.all_end_times[start:stop]
+        self._dt_start_times = None
+        self._dt_end_times = None
+
+    @property
+    def dt_start_times(self) -> DatetimeIndex:
+        """The start times of the maps as time coordinates of the data cubes, see import_udf_modules()"""
+        if self._dt_start_times is None:
+            self._dt_start_times = DatetimeIndex(self.start_times)
+        return self._dt_start_times
+
+    @property
+    def dt_end_times(self) -> DatetimeIndex:
+        """The end times of the maps as time coordinates of the data cubes, see import_udf_modules()"""
+        if self._dt_end_times is None:
+            self._dt_end_times = DatetimeIndex(self.end_times)
+        return self._dt_end_times
 
     @staticmethod
-    def create_datacube(id: str, region: Region, array, index: int, usable_rows: int,
-                        start_times: DatetimeIndex, end_times: DatetimeIndex) -> DataCube:
+    def create_datacube(id: str, grid: "RegionGrid", array, index: int, usable_rows: int,
+                        start_times: DatetimeIndex, end_times: DatetimeIndex,
+                        col: int = 0, usable_cols: Optional[int] = None) -> DataCube:
         """Create a data cube
 
         >>> array = xarray.DataArray(numpy.zeros(shape=(2, 3)), coords={'x': [1, 2], 'y': [1, 2, 3]}, dims=('x', 'y'))
@@ -156,71 +800,1673 @@ class StrdsEntry:
         >>> h = DataCube(array=array)
 
         :param id: The id of the strds
-        :param region: The GRASS GIS Region
+        :param grid: The precomputed cell center coordinates of the region
         :param array: The three dimensional array of data
         :param index: The current index
         :param usable_rows: The number of usable rows
         :param start_times: Start timed
         :param end_times: End tied
+        :param col: The index of the first column
+        :param usable_cols: The number of usable columns, the full width of the region if None
         :return: The udf data object
         """
+        if usable_cols is None:
+            xcoords = grid.xcoords[col:]
+        else:
+            xcoords = grid.xcoords[col:col + usable_cols]
+        ycoords = grid.ycoords[index:index + usable_rows]
 
-        left = region.west
-        top = region.north + index * region.nsres
+        new_array = xarray.DataArray(array, dims=('t', 'y', 'x'), coords=[start_times, ycoords, xcoords])
+        new_array.name = id
 
-        xcoords = []
-        for col in range(region.cols):
-            xcoords.append(left + col * region.ewres + region.ewres/2.0)
+        return DataCube(array=new_array)
 
-        ycoords = []
-        for row in range(usable_rows):
-            ycoords.append(top + row * region.nsres + region.nsres/2.0)
 
-        tcoords = start_times.tolist()
+def udf_context() -> Dict:
+    """Return the global namespace in which the UDF code is executed
 
-        new_array = xarray.DataArray(array, dims=('t', 'y', 'x'), coords=[tcoords, ycoords, xcoords])
-        new_array.name = id
+    This is the default execution context of the openEO UDF API, if available.
+    """
+    try:
+        from openeo_udf.api.run_code import _build_default_execution_context
+        return _build_default_execution_context()
+    except ImportError:
+        return {"numpy": np, "np": np, "xarray": xarray, "pandas": pandas,
+                "DataCube": DataCube, "UdfData": UdfData}
 
-        return DataCube(array=new_array)
 
+class UdfRunner:
+    """Run the user defined code (udf) on the data cubes of a block
+
+    The "openeo" engine runs the code with the openEO UDF API for each block. The
+    "compiled" engine compiles and executes the code once and calls the resolved
+    UDF function for each block. It falls back to the openEO UDF API if the code
+    can not be executed on its own or does not define a function annotated with UdfData.
+    """
+
+    def __init__(self, code: str, epsg_code: str, engine: str = "compiled", filename: str = "<udf>"):
+
+        self.code = code
+        self.epsg_code = epsg_code
+        self.engine = engine
+        self.filename = filename
+        self.function = None
+        self.setup_time = 0.0
+
+        if engine == "compiled":
+            start = time.perf_counter()
+            self.function = self.load_function()
+            self.setup_time = time.perf_counter() - start
+
+            if self.function is None:
+                gcore.warning(_("No UDF function found in <%s>, the code is run for each block") % filename)
+
+    def load_function(self):
+        """Compile and execute the UDF code and return its UDF function
+
+        The UDF function is the function defined in the code that takes a single
+        argument annotated with UdfData, like the functions called by run_user_code().
+        Other functions of the code, like helpers, are never called directly.
+
+        :return: The UDF function or None if it can not be resolved
+        """
+        namespace = udf_context()
+        try:
+            # The code must not inherit the future imports of this module, which
+            # would turn the annotations of the UDF into strings
+            exec(compile(self.code, self.filename, "exec", dont_inherit=True), namespace)
+        except NameError:
+            # The code expects the udf data object in its namespace
+            return None
+
+        for value in namespace.values():
+            if not inspect.isfunction(value) or value.__code__.co_filename != self.filename:
+                continue
+            params = list(inspect.signature(value).parameters.values())
+            if len(params) != 1:
+                continue
+            annotation = params[0].annotation
+            if annotation is UdfData or annotation == "UdfData" or annotation == "openeo_udf.api.udf_data.UdfData":
+                return value
+
+        return None
+
+    def run(self, datacube_list: List[DataCube]) -> UdfData:
+        """Run the user defined code (udf) and  create the required input for the function
+
+        :param datacube_list: The data cubes of the input strds
+        :return: The resulting udf data object
+        """
+        data = UdfData(proj={"EPSG": self.epsg_code}, datacube_list=datacube_list)
+
+        if self.function is None:
+            return run_user_code(code=self.code, data=data)
+
+        result = self.function(data)
+        if isinstance(result, UdfData):
+            return result
+
+        return data
+
+    def report(self, num_blocks: int):
+        """Report the time that was saved by compiling the code only once
+
+        :param num_blocks: The number of blocks the UDF was called for
+        """
+        if self.function is None:
+            return
+
+        gcore.message(_("The UDF code was compiled once in %.4f seconds, compiling it for each of the "
+                        "%i blocks would have taken about %.4f seconds")
+                      % (self.setup_time, num_blocks, self.setup_time * num_blocks))
+
+
+def cube_results(data: UdfData, num_cubes: int) -> Tuple[List[np.ndarray], List[Optional[xarray.DataArray]]]:
+    """Return the arrays of the first num_cubes resulting data cubes and their time coordinates
+
+    :param data: The udf data object returned by the UDF
+    :param num_cubes: The number of resulting data cubes that are written
+    :return: A tuple of the list of numpy arrays and the list of time coordinates,
+             None for cubes without time axis
+    """
+    arrays = []
+    tcoords = []
+    for datacube in data.get_datacube_list()[:num_cubes]:
+        cube_array: xarray.DataArray = datacube.get_array()
+        arrays.append(cube_array.values)
+        tcoords.append(cube_array.coords['t'] if 't' in cube_array.coords else None)
+
+    return arrays, tcoords
+
+
+class Reducer:
+    """Reduce the time axis of the blocks of the input strds with vectorized numpy functions
+
+    The results are the same as reducing the data cubes of the input strds in a UDF with
+    cube.array.sum/mean/max/min/median(dim="t"), without creating the data cubes and
+    running any user code. Null cells are skipped, cells without any value are null,
+    except for the sum, which is 0 as in xarray.
+
+    Null cells of CELL data cubes are skipped as well and the results are float arrays
+    with NaN for cells without any value, while the data cubes of the UDF
+    contain them as CELL_NULL values. A UDF gets the same results only if it masks them,
+    like cube.array.where(cube.array != CELL_NULL).max(dim="t").
+    """
+
+    functions = {"sum": np.nansum, "mean": np.nanmean, "max": np.nanmax,
+                 "min": np.nanmin, "median": np.nanmedian}
 
-def count_resulting_maps(input_strds: List[StrdsEntry], code: str, epsg_code: str) -> int:
-    """Run the UDF code for a single raster line for each input map and count the
-    resulting slices in the first raster collection tile
+    def __init__(self, name: str):
 
-    :param input_strds: The dict of input strds
-    :param code: The UDF code
-    :param epsg_code: The EPSG code
-    :return: The number of slices that were counted
+        self.name = name
+        self.function = self.functions[name]
+
+    def reduce(self, array: np.ndarray, mtype: str) -> np.ndarray:
+        """Reduce the time axis of a (t, y, x) block array
+
+        :param array: The block array of an input strds
+        :param mtype: The map type of the input strds
+        :return: The (y, x) result array
+        """
+        if mtype == "CELL":
+            nulls = array == CELL_NULL
+            if not nulls.any():
+                return self.function(array, axis=0)
+            array = np.where(nulls, np.nan, array)
+
+        # All null cells are expected, numpy warns about them
+        with np.errstate(invalid="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            result = self.function(array, axis=0)
+
+        # Cells without any value are NaN, the writer converts them to the null value of the output maps
+        return result
+
+
+class Block:
+    """A block of rows of the region together with the input arrays read and the results computed for it"""
+
+    def __init__(self, index: int, usable_rows: int, col: int, usable_cols: int):
+
+        self.index = index
+        self.usable_rows = usable_rows
+        self.col = col
+        self.usable_cols = usable_cols
+        self.arrays: List[np.ndarray] = []
+        self.buffers: List[BlockBuffer] = []
+        self.result: Optional[List[np.ndarray]] = None
+        self.tcoords: List[Optional[xarray.DataArray]] = []
+        self.all_null = False
+
+
+def create_blocks(region: Region, nrows: int, tilecols: int = 0) -> List[Tuple[int, int, int, int]]:
+    """Split the region into blocks of rows or, if tilecols is set, into tiles
+
+    The blocks are ordered row-wise, so that all tiles of a band of rows are
+    processed before the next band.
+
+    :param region: The GRASS GIS Region
+    :param nrows: The number of rows of a block
+    :param tilecols: The number of columns of a tile, full width blocks of rows are created if 0
+    :return: The list of (index, usable_rows, col, usable_cols) tuples of the blocks
+    """
+    if tilecols <= 0:
+        tilecols = region.cols
+
+    blocks = []
+    for index in range(0, region.rows, nrows):
+        for col in range(0, region.cols, tilecols):
+            blocks.append((index, min(nrows, region.rows - index), col, min(tilecols, region.cols - col)))
+
+    return blocks
+
+
+class CubeCache:
+    """An on-disk cache of the (t, y, x) cubes of the input strds for the current region
+
+    A cube is stored as numpy file that is memory mapped, so that the blocks are
+    views of the file without decoding the raster rows again. The cubes are keyed
+    by the ids, the map type and the modification times of the maps and by the
+    region. Cubes of the same strds and region with another key are outdated and
+    removed, and the least recently used cubes are removed to keep the cache
+    within its size limit.
+    """
+
+    def __init__(self, directory: str, maxsize: int):
+
+        self.directory = directory
+        self.maxsize = maxsize * 1024 * 1024
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def map_mtime(map_id: str) -> float:
+        """Return the latest modification time of the files of a raster map"""
+        name, mapset = map_id.split("@")
+        env = gcore.gisenv()
+        mapset_dir = os.path.join(env["GISDBASE"], env["LOCATION_NAME"], mapset)
+        mtime = 0.0
+        for path in (os.path.join(mapset_dir, "cellhd", name), os.path.join(mapset_dir, "cell", name),
+                     os.path.join(mapset_dir, "fcell", name), os.path.join(mapset_dir, "cell_misc", name)):
+            if os.path.exists(path):
+                mtime = max(mtime, os.path.getmtime(path))
+                if os.path.isdir(path):
+                    mtime = max([mtime] + [os.path.getmtime(os.path.join(path, entry)) for entry in os.listdir(path)])
+        return mtime
+
+    def key(self, strds: StrdsEntry, region: Region) -> Tuple[str, Dict]:
+        """Return the key of the cube of an input strds and its description
+
+        :param strds: The input strds, after its setup
+        :param region: The GRASS GIS Region
+        :return: The hash of the key and the description of the cube
+        """
+        description = {"strds": strds.strds.get_id(), "mtype": strds.ctype,
+                       "region": [region.north, region.south, region.east, region.west,
+                                  region.rows, region.cols]}
+        key = dict(description, maps=[[map.get_id(), self.map_mtime(map.get_id())] for map in strds.all_map_list])
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest(), description
+
+    def entries(self) -> List[Tuple[str, Dict]]:
+        """Return the hashes and descriptions of the cached cubes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name), "r") as description_file:
+                    entries.append((name[:-len(".json")], json.load(description_file)))
+        return entries
+
+    def remove(self, key: str):
+        """Remove a cached cube"""
+        for suffix in (".json", ".npy"):
+            path = os.path.join(self.directory, key + suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    def evict(self, nbytes: int):
+        """Remove the least recently used cubes until a cube of nbytes fits into the cache"""
+        cubes = []
+        for key, _description in self.entries():
+            path = os.path.join(self.directory, key + ".npy")
+            if os.path.exists(path):
+                cubes.append((os.path.getmtime(path), os.path.getsize(path), key))
+
+        total = sum(size for _mtime, size, _key in cubes)
+        for _mtime, size, key in sorted(cubes):
+            if total + nbytes <= self.maxsize:
+                break
+            gcore.verbose(_("Removing the least recently used cube <%s> from the cache") % key)
+            self.remove(key)
+            total -= size
+
+    def load(self, strds: StrdsEntry, region: Region) -> Optional[np.ndarray]:
+        """Return the memory mapped cube of an input strds, the cube is created if it is not cached
+
+        :param strds: The input strds, after its setup
+        :param region: The GRASS GIS Region
+        :return: The (t, y, x) cube with copy-on-write access, None if it exceeds the cache size
+        """
+        key, description = self.key(strds, region)
+        path = os.path.join(self.directory, key + ".npy")
+
+        if os.path.exists(path):
+            gcore.message(_("Reading the cached cube of <%s>") % strds.strds.get_id())
+            # The modification time orders the cubes by their last use
+            os.utime(path)
+            return np.load(path, mmap_mode="c")
+
+        # Outdated cubes of the same strds and region are removed
+        for other, other_description in self.entries():
+            if other_description == description:
+                self.remove(other)
+
+        dtype = np.dtype(RTYPE[strds.ctype]['numpy'])
+        shape = (len(strds.all_map_list), region.rows, region.cols)
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        if nbytes > self.maxsize:
+            gcore.warning(_("The cube of <%s> exceeds the cache size and is not cached") % strds.strds.get_id())
+            return None
+        self.evict(nbytes)
+
+        gcore.message(_("Caching the cube of <%s>") % strds.strds.get_id())
+        cube = np.lib.format.open_memmap(path + ".tmp", mode="w+", dtype=dtype, shape=shape)
+        row = Buffer(shape=(region.cols,), mtype=strds.ctype)
+        for tindex, map in enumerate(strds.all_map_list):
+            rmap = strds.handles.get(map.get_id())
+            for index in range(region.rows):
+                strds.get_row(rmap, index, row)
+                cube[tindex, index] = row
+        cube.flush()
+        del cube
+
+        # The cube is only visible to other runs once it is complete
+        os.replace(path + ".tmp", path)
+        with open(os.path.join(self.directory, key + ".json"), "w") as description_file:
+            json.dump(description, description_file)
+
+        return np.load(path, mmap_mode="c")
+
+
+def create_windows(num_maps: int, window: int, step: int) -> List[Tuple[int, int]]:
+    """Split the maps ordered by start time into temporal windows
+
+    Only full windows are created, the maps after the last full window are not processed.
+
+    :param num_maps: The number of maps of the input strds
+    :param window: The number of maps of a window, a single window with all maps is created if 0
+    :param step: The number of maps between the first maps of two windows
+    :return: The list of (start, stop) map indices of the windows
     """
+    if window <= 0 or window >= num_maps:
+        return [(0, num_maps)]
+
+    return [(start, start + window) for start in range(0, num_maps - window + 1, step)]
+
+
+def read_aoi_columns(region: Region, nrows: int, raster: Optional[str] = None,
+                     bbox: Optional[List[float]] = None) -> List[np.ndarray]:
+    """Return the columns that intersect the area of interest for each band of rows
+
+    :param region: The GRASS GIS Region
+    :param nrows: The number of rows of a band
+    :param raster: The raster map whose non-null cells are the area of interest
+    :param bbox: The north, south, east and west edges of the area of interest
+    :return: The list of boolean column masks of the bands
+    """
+    bands = [np.zeros(region.cols, dtype=bool) for _index in range(0, region.rows, nrows)]
+
+    if bbox is not None:
+        north, south, east, west = bbox
+        # A bounding box outside of the region gives empty row or column ranges
+        first_row = min(max(0, int(math.floor((region.north - north) / region.nsres))), region.rows)
+        last_row = min(max(0, int(math.ceil((region.north - south) / region.nsres))), region.rows)
+        first_col = min(max(0, int(math.floor((west - region.west) / region.ewres))), region.cols)
+        last_col = min(max(0, int(math.ceil((east - region.west) / region.ewres))), region.cols)
+        if first_col < last_col:
+            for index in range(first_row, last_row):
+                bands[index // nrows][first_col:last_col] = True
+        return bands
+
+    rmap = RasterRow(raster)
+    rmap.open(mode="r")
+    row = Buffer(shape=(region.cols,), mtype=rmap.mtype)
+    for index in range(region.rows):
+        rmap.get_row(index, row)
+        if rmap.mtype == "CELL":
+            bands[index // nrows] |= row != CELL_NULL
+        else:
+            bands[index // nrows] |= ~np.isnan(row)
+    rmap.close()
+
+    return bands
+
+
+def create_aoi_blocks(region: Region, nrows: int, band_columns: List[np.ndarray],
+                      tilecols: int = 0) -> Tuple[List[Tuple[int, int, int, int]], set]:
+    """Split the region into blocks that are inside or outside of the area of interest
+
+    Each band of rows is split into the column windows in which all columns intersect
+    the area of interest or none does. If tilecols is set, the tiles are used as column
+    windows, a tile is inside if any of its columns intersects.
+
+    :param region: The GRASS GIS Region
+    :param nrows: The number of rows of a block
+    :param band_columns: The column masks of the bands, see read_aoi_columns()
+    :param tilecols: The number of columns of a tile, the column windows follow the area of interest if 0
+    :return: The list of (index, usable_rows, col, usable_cols) tuples of the blocks and
+             the set of (index, col) tuples of the blocks outside of the area of interest
+    """
+    blocks = []
+    outside = set()
+    for band, columns in enumerate(band_columns):
+        index = band * nrows
+        usable_rows = min(nrows, region.rows - index)
+
+        if tilecols > 0:
+            windows = [(col, min(tilecols, region.cols - col), bool(columns[col:col + tilecols].any()))
+                       for col in range(0, region.cols, tilecols)]
+        else:
+            edges = np.flatnonzero(np.diff(columns.astype(np.int8))) + 1
+            starts = [0] + edges.tolist()
+            stops = edges.tolist() + [region.cols]
+            windows = [(start, stop - start, bool(columns[start])) for start, stop in zip(starts, stops)]
+
+        for col, usable_cols, inside in windows:
+            blocks.append((index, usable_rows, col, usable_cols))
+            if not inside:
+                outside.add((index, col))
+
+    return blocks, outside
+
+
+def find_duplicates(input_strds: List[StrdsEntry]):
+    """Link each input strds to the first input strds with the same maps and map type, if any
+
+    The blocks of duplicated input strds are not read, they share the array of the
+    first input strds.
+
+    :param input_strds: The list of input strds
+    """
+    first_entries: Dict[Tuple[Tuple[str, ...], str], int] = {}
+    for count, strds in enumerate(input_strds):
+        key = (tuple(strds.map_ids), strds.ctype)
+        if key in first_entries:
+            strds.duplicate_of = first_entries[key]
+        else:
+            first_entries[key] = count
+            strds.duplicate_of = None
+
+
+def compute_nrows(input_strds: List[StrdsEntry], ncols: int, memory: int, nprocs: int, pipeline: bool,
+                  band_cols: int = 0) -> int:
+    """Compute the largest number of rows of a block that keeps the data cubes within a memory budget
+
+    The memory of a block is the size of the (t, y, x) arrays of all input strds that
+    are read, see find_duplicates(). It is multiplied by the number of blocks that are
+    in flight at the same time. It is assumed that the UDF needs at most as much memory
+    for its results as for its input data cubes. In tile mode the full width band
+    buffer, from which the tiles are copied, is added once.
+
+    :param input_strds: The list of input strds, after their setup
+    :param ncols: The number of columns of a block
+    :param memory: The memory budget in MB
+    :param nprocs: The number of worker processes
+    :param pipeline: True if the processing is pipelined
+    :param band_cols: The number of columns of the band buffers in tile mode, 0 if not in tile mode
+    :return: The number of rows of a block, at least 1
+    """
+    bytes_per_row = 0
+    band_bytes_per_row = 0
+    for strds in input_strds:
+        if strds.duplicate_of is None:
+            itemsize = np.dtype(RTYPE[strds.ctype]['numpy']).itemsize
+            bytes_per_row += len(strds.map_list) * ncols * itemsize
+            band_bytes_per_row += len(strds.map_list) * band_cols * itemsize
+
+    # The blocks in the pool window or in the pipeline queues and stages
+    num_blocks = 2 * nprocs + 1 if nprocs > 1 else 1
+    if pipeline:
+        num_blocks += 6
+
+    return max(1, int(memory * 1024 * 1024 // (2 * num_blocks * bytes_per_row + band_bytes_per_row)))
+
+
+def read_blocks(input_strds: List[StrdsEntry], blocks: List[Tuple[int, int, int, int]], check_null: bool = False,
+                profiler: Optional[Profiler] = None, outside: Optional[set] = None):
+    """Read the blocks of all input strds into block buffers
+
+    Each block gets its own buffers from the input strds, they must be released
+    with release_block() after the block was written. Duplicated input strds share
+    the array of the input strds they duplicate, without copy. Maps that are
+    registered in several input strds are read only once for each block.
+
+    :param input_strds: The list of input strds
+    :param blocks: The list of (index, usable_rows, col, usable_cols) tuples of the blocks
+    :param check_null: Set the all_null attribute of blocks in which all cells of all inputs are null
+    :param profiler: The profiler of the read stage
+    :param outside: The set of (index, col) tuples of the blocks outside of the area of interest,
+                    they are not read and marked as all null
+    :return: A generator of blocks with the input arrays set
+    """
+    profiler = profiler or Profiler()
+
+    for index, usable_rows, col, usable_cols in blocks:
+        block = Block(index=index, usable_rows=usable_rows, col=col, usable_cols=usable_cols)
+        if outside and (index, col) in outside:
+            block.buffers = [None] * len(input_strds)
+            block.all_null = True
+            yield block
+            continue
+
+        start = time.perf_counter()
+        nbytes = 0
+        shared = {}
+        for strds in input_strds:
+            if strds.duplicate_of is not None:
+                block.buffers.append(None)
+                block.arrays.append(block.arrays[strds.duplicate_of])
+                continue
+
+            buffer = strds.acquire_buffer() if strds.cube is None else None
+            block.buffers.append(buffer)
+            block.arrays.append(strds.read_block(index=index, usable_rows=usable_rows, buffer=buffer,
+                                                 col=col, usable_cols=usable_cols, shared=shared))
+            nbytes += block.arrays[-1].nbytes
+
+        if check_null:
+            block.all_null = all(is_null(array, strds.ctype) for strds, array in zip(input_strds, block.arrays))
+
+        profiler.add(name="read", start=start, end=time.perf_counter(), nbytes=nbytes, rows=usable_rows)
+        yield block
+
+
+def count_slices(array: np.ndarray) -> int:
+    """Count the slices of a resulting (t, y, x) or (y, x) array
+
+    :param array: The result array of a block
+    :return: The number of slices
+    """
+    if array.ndim == 3:
+        return array.shape[0]
+    return 1
+
+
+def probe_first_block(input_strds: List[StrdsEntry], blocks: List[Tuple[int, int, int, int]],
+                      runner: "UdfRunner", grid: "RegionGrid", num_cubes: int = 1,
+                      profiler: Optional[Profiler] = None, service: Optional["ServiceClient"] = None) -> Block:
+    """Run the UDF on the first block to determine the number of resulting slices
+
+    The computed block is kept, so that it can be written as the first block
+    instead of being computed again.
+
+    :param input_strds: The list of input strds
+    :param blocks: The list of (index, usable_rows, col, usable_cols) tuples of the blocks
+    :param runner: The UDF runner
+    :param grid: The precomputed cell center coordinates of the region
+    :param num_cubes: The number of resulting data cubes that are written
+    :param profiler: The profiler of the stages
+    :param service: The client of the UDF service that runs the UDF, the UDF is run in this process if None
+    :return: The first block with its results set
+    """
+    read = read_blocks(input_strds=input_strds, blocks=blocks[:1], profiler=profiler)
+    if service is not None:
+        return next(service.run_blocks(blocks=read, profiler=profiler))
+    return next(run_blocks(input_strds=input_strds, blocks=read, runner=runner, grid=grid,
+                           num_cubes=num_cubes, profiler=profiler))
+
 
-    # We need to count the number of slices that are returned from the udf, so we feed the first row to
-    # the udf
-    numberof_slices = 0
+def release_block(input_strds: List[StrdsEntry], block: Block):
+    """Release the block buffers of a written block
 
+    :param input_strds: The list of input strds
+    :param block: The block that was written
+    """
+    for strds, buffer in zip(input_strds, block.buffers):
+        if buffer is not None:
+            strds.release_buffer(buffer)
+    block.buffers = []
+    block.arrays = []
+
+
+def run_blocks(input_strds: List[StrdsEntry], blocks, runner: UdfRunner, grid: RegionGrid,
+               num_cubes: int = 1, profiler: Optional[Profiler] = None):
+    """Run the UDF on the read blocks one after the other in this process
+
+    :param input_strds: The list of input strds
+    :param blocks: The iterable of read blocks
+    :param runner: The UDF runner
+    :param grid: The precomputed cell center coordinates of the region
+    :param num_cubes: The number of resulting data cubes that are written
+    :param profiler: The profiler of the cube and udf stages
+    :return: A generator of blocks with the results of the first num_cubes resulting cubes set,
+             in block order, the result of all null blocks is None
+    """
+    profiler = profiler or Profiler()
+
+    for block in blocks:
+        if block.all_null:
+            yield block
+            continue
+
+        # Create the cubes of all input strds
+        with profiler.stage("cube", rows=block.usable_rows):
+            datacubes = []
+            for strds, array in zip(input_strds, block.arrays):
+                datacubes.append(StrdsEntry.create_datacube(id=strds.strds.get_id(), grid=grid, array=array,
+                                                            index=block.index, usable_rows=block.usable_rows,
+                                                            start_times=strds.dt_start_times,
+                                                            end_times=strds.dt_end_times,
+                                                            col=block.col, usable_cols=block.usable_cols))
+
+        # Run the UDF code
+        with profiler.stage("udf", nbytes=sum(array.nbytes for array in block.arrays), rows=block.usable_rows):
+            data = runner.run(datacube_list=datacubes)
+            block.result, block.tcoords = cube_results(data, num_cubes=num_cubes)
+
+        yield block
+
+
+def reduce_blocks(input_strds: List[StrdsEntry], blocks, reducer: Reducer, num_cubes: int = 1,
+                  profiler: Optional[Profiler] = None):
+    """Reduce the time axis of the read blocks with a built-in reducer in this process
+
+    :param input_strds: The list of input strds
+    :param blocks: The iterable of read blocks
+    :param reducer: The reducer
+    :param num_cubes: The number of results that are written, one for each of the first input strds
+    :param profiler: The profiler of the reduce stage
+    :return: A generator of blocks with the results set, in block order, the result of
+             all null blocks is None
+    """
+    profiler = profiler or Profiler()
+
+    for block in blocks:
+        if block.all_null:
+            yield block
+            continue
+
+        with profiler.stage("reduce", nbytes=sum(array.nbytes for array in block.arrays), rows=block.usable_rows):
+            block.result = []
+            for strds, array in zip(input_strds[:num_cubes], block.arrays):
+                # Duplicated input strds have the same result
+                if strds.duplicate_of is not None:
+                    block.result.append(block.result[strds.duplicate_of])
+                else:
+                    block.result.append(reducer.reduce(array, strds.ctype))
+            block.tcoords = [None] * len(block.result)
+
+        yield block
+
+
+# The state of a worker process of the process pool, set by init_worker()
+worker_state = {}
+
+
+def init_worker(runner: UdfRunner, grid: RegionGrid, cube_specs: List[Tuple[str, DatetimeIndex, DatetimeIndex]],
+                num_cubes: int):
+    """Initialize a worker process of the process pool
+
+    :param runner: The UDF runner, forked with the already compiled UDF function
+    :param grid: The precomputed cell center coordinates of the region
+    :param cube_specs: The list of (id, start_times, end_times) tuples of the input strds
+    :param num_cubes: The number of resulting data cubes that are written
+    """
+    worker_state["runner"] = runner
+    worker_state["num_cubes"] = num_cubes
+    worker_state["grid"] = grid
+    worker_state["cube_specs"] = cube_specs
+
+
+def run_worker_block(index: int, usable_rows: int, col: int, usable_cols: int, arrays: List[np.ndarray],
+                     state: Optional[Dict] = None) -> Tuple[List[np.ndarray], List[Optional[np.ndarray]], List[Tuple]]:
+    """Create the data cubes of a block and run the UDF on them in a worker process
+
+    The start and end times of the cube and udf stages are returned, so that they
+    can be added to the profiler of the main process. The time coordinates are
+    returned as numpy arrays, so that a client of the UDF service does not need to
+    import xarray and pandas to unpickle them.
+
+    :param index: The index of the first row of the block
+    :param usable_rows: The number of rows of the block
+    :param col: The index of the first column of the block
+    :param usable_cols: The number of columns of the block
+    :param arrays: The (t, y, x) arrays of the input strds
+    :param state: The state set up like by init_worker(), the state of this worker process if None
+    :return: The arrays and the time coordinates of the resulting cubes as numpy arrays
+             and the list of (name, start, end, pid) tuples of the stages
+    """
+    if state is None:
+        state = worker_state
+
+    cube_start = time.perf_counter()
     datacubes = []
-    for entry in input_strds:
-        datacubes.append(entry.to_datacube(index=0, usable_rows=1))
+    for (id, start_times, end_times), array in zip(state["cube_specs"], arrays):
+        datacubes.append(StrdsEntry.create_datacube(id=id, grid=state["grid"], array=array,
+                                                    index=index, usable_rows=usable_rows,
+                                                    start_times=start_times, end_times=end_times,
+                                                    col=col, usable_cols=usable_cols))
+
+    udf_start = time.perf_counter()
+    data = state["runner"].run(datacube_list=datacubes)
+    result, tcoords = cube_results(data, num_cubes=state["num_cubes"])
+    tcoords = [coords.values if coords is not None else None for coords in tcoords]
+    udf_end = time.perf_counter()
+
+    pid = os.getpid()
+    return result, tcoords, [("cube", cube_start, udf_start, pid), ("udf", udf_start, udf_end, pid)]
+
+
+def create_worker_pool(input_strds: List[StrdsEntry], runner: UdfRunner, grid: RegionGrid, nprocs: int,
+                       num_cubes: int = 1):
+    """Create the pool of worker processes that run the UDF on the blocks
+
+    Forking a process while other threads run may deadlock the forked processes,
+    hence the pool must be created before the compute stage runs in a background thread.
+
+    :param input_strds: The list of input strds
+    :param runner: The UDF runner
+    :param grid: The precomputed cell center coordinates of the region
+    :param nprocs: The number of worker processes
+    :param num_cubes: The number of resulting data cubes that are written
+    :return: The process pool
+    """
+    cube_specs = [(strds.strds.get_id(), strds.dt_start_times, strds.dt_end_times) for strds in input_strds]
+    # The compiled UDF function is not picklable, hence the workers are forked
+    return get_context("fork").Pool(processes=nprocs, initializer=init_worker,
+                                    initargs=(runner, grid, cube_specs, num_cubes))
+
+
+def run_blocks_parallel(blocks, pool, nprocs: int, profiler: Optional[Profiler] = None):
+    """Run the UDF on the read blocks in a pool of worker processes
+
+    At most 2 * nprocs blocks are in flight. The results are returned in block order, so
+    that a single writer can put the rows into the output maps.
+
+    :param blocks: The iterable of read blocks
+    :param pool: The process pool of create_worker_pool()
+    :param nprocs: The number of worker processes
+    :param profiler: The profiler of the cube and udf stages
+    :return: A generator of blocks with the results of the first num_cubes resulting cubes set,
+             in block order, the result of all null blocks is None
+    """
+    profiler = profiler or Profiler()
+    pending = deque()
+
+    def next_block():
+        block, result = pending.popleft()
+        if result is not None:
+            block.result, block.tcoords, stages = result.get()
+            nbytes = sum(array.nbytes for array in block.arrays)
+            for name, start, end, pid in stages:
+                profiler.add(name=name, start=start, end=end, nbytes=nbytes if name == "udf" else 0,
+                             rows=block.usable_rows, pid=pid, tid=pid)
+        return block
+
+    for block in blocks:
+        if block.all_null:
+            pending.append((block, None))
+        else:
+            # The block buffers are released after the block was written, so the
+            # arrays are pickled by the pool before the buffers are reused
+            pending.append((block, pool.apply_async(run_worker_block,
+                                                    (block.index, block.usable_rows, block.col,
+                                                     block.usable_cols, block.arrays))))
+
+        if len(pending) >= 2 * nprocs:
+            yield next_block()
+
+    while pending:
+        yield next_block()
+
+
+class UdfService:
+    """A long-lived local service that runs the UDF of the submitted jobs
 
-    data = run_udf(code=code, epsg_code=epsg_code, datacube_list=datacubes)
-    for slice in data.get_datacube_list()[0].array:
-        numberof_slices += 1
+    The service keeps the Python modules imported and the compiled UDF runners
+    of all jobs cached by their code, so that a job only pays for the transfer
+    of its blocks. Each client connection is a job that is served by its own thread.
 
-    return numberof_slices
+    The messages of a job are ("setup", code, epsg_code, engine, filename, grid,
+    map_times, num_cubes), followed by ("run", index, usable_rows, col, usable_cols,
+    arrays) for each block. Each message is answered by ("ok", result) or ("error", message).
+
+    The clients are authenticated with the key of service_authkey().
+    """
+
+    def __init__(self, address: str):
+
+        self.address = address
+        self.runners: Dict[Tuple[str, str, str], UdfRunner] = {}
+        self.lock = threading.Lock()
+
+    def get_runner(self, code: str, epsg_code: str, engine: str, filename: str) -> UdfRunner:
+        """Return the cached runner of a UDF, the UDF is compiled for the first job that submits it"""
+        key = (code, epsg_code, engine)
+        with self.lock:
+            if key not in self.runners:
+                self.runners[key] = UdfRunner(code=code, epsg_code=epsg_code, engine=engine, filename=filename)
+            return self.runners[key]
+
+    def serve(self):
+        """Accept jobs until the service is interrupted"""
+        if os.path.exists(self.address):
+            with socket.socket(socket.AF_UNIX) as probe:
+                try:
+                    probe.connect(self.address)
+                    running = True
+                except OSError:
+                    running = False
+            if running:
+                gcore.fatal(_("A UDF service is already running at <%s>") % self.address)
+            # Remove the socket of a service that was not shut down
+            os.remove(self.address)
+
+        authkey = service_authkey(self.address, create=True)
+        gcore.message(_("UDF service is listening at <%s>") % self.address)
+        try:
+            with Listener(self.address, family="AF_UNIX", authkey=authkey) as listener:
+                while True:
+                    try:
+                        connection = listener.accept()
+                    except (AuthenticationError, EOFError, OSError):
+                        # Clients that fail to authenticate are refused
+                        continue
+                    threading.Thread(target=self.serve_job, args=(connection,), daemon=True).start()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for path in (self.address, self.address + ".key"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def serve_job(self, connection):
+        """Run the UDF on the blocks of a job until the client closes the connection"""
+        state = {}
+        with connection:
+            while True:
+                try:
+                    message = connection.recv()
+                except EOFError:
+                    return
+
+                try:
+                    if message[0] == "setup":
+                        code, epsg_code, engine, filename, grid, map_times, num_cubes = message[1:]
+                        cube_specs = [(id, DatetimeIndex(start_times), DatetimeIndex(end_times))
+                                      for id, start_times, end_times in map_times]
+                        state = {"runner": self.get_runner(code, epsg_code, engine, filename), "grid": grid,
+                                 "cube_specs": cube_specs, "num_cubes": num_cubes}
+                        result = None
+                    else:
+                        result = run_worker_block(*message[1:], state=state)
+                    connection.send(("ok", result))
+                except Exception:
+                    connection.send(("error", traceback.format_exc()))
+
+
+class ServiceClient:
+    """The client of a UDF service that submits the blocks of this job to it"""
+
+    def __init__(self, connection, input_strds: List[StrdsEntry], num_cubes: int):
+
+        self.connection = connection
+        self.input_strds = input_strds
+        self.num_cubes = num_cubes
+
+    @staticmethod
+    def connect(address: str) -> Optional["ServiceClient"]:
+        """Connect to a running UDF service
+
+        :param address: The Unix socket of the service
+        :return: The connection, None if the service is not running
+        """
+        authkey = service_authkey(address)
+        if authkey is None:
+            return None
+        try:
+            return Client(address, family="AF_UNIX", authkey=authkey)
+        except OSError:
+            return None
+        except AuthenticationError:
+            gcore.fatal(_("The UDF service at <%s> refused the authentication key") % address)
+
+    def request(self, *message):
+        """Send a message to the service and return its answer"""
+        self.connection.send(message)
+        return self.receive()
+
+    def receive(self):
+        """Receive the answer of the service, errors of the service are fatal"""
+        status, result = self.connection.recv()
+        if status == "error":
+            gcore.fatal(_("The UDF service failed:\n%s") % result)
+        return result
+
+    def setup(self, code: str, epsg_code: str, engine: str, filename: str, grid: RegionGrid):
+        """Submit the UDF and the input strds of the next blocks to the service
+
+        The start and end times of the maps are sent as lists, so that this process
+        does not need to import pandas.
+        """
+        map_times = [(strds.strds.get_id(), strds.start_times, strds.end_times) for strds in self.input_strds]
+        self.request("setup", code, epsg_code, engine, filename, grid, map_times, self.num_cubes)
+
+    def run_blocks(self, blocks, profiler: Optional[Profiler] = None):
+        """Run the UDF on the read blocks in the service
+
+        The next block is sent before the result of the previous block is received,
+        so that the service computes while this process reads and writes.
+
+        :param blocks: The iterable of read blocks
+        :param profiler: The profiler of the cube and udf stages
+        :return: A generator of blocks with the results set, in block order,
+                 the result of all null blocks is None
+        """
+        profiler = profiler or Profiler()
+        pending = deque()
+
+        def next_block():
+            block, sent = pending.popleft()
+            if sent:
+                block.result, block.tcoords, stages = self.receive()
+                nbytes = sum(array.nbytes for array in block.arrays)
+                for name, start, end, pid in stages:
+                    profiler.add(name=name, start=start, end=end, nbytes=nbytes if name == "udf" else 0,
+                                 rows=block.usable_rows, pid=pid, tid=pid)
+            return block
+
+        for block in blocks:
+            if block.all_null:
+                pending.append((block, False))
+            else:
+                self.connection.send(("run", block.index, block.usable_rows, block.col,
+                                      block.usable_cols, block.arrays))
+                pending.append((block, True))
+
+            if len(pending) >= 2:
+                yield next_block()
+
+        while pending:
+            yield next_block()
+
+    def close(self):
+        """Close the connection, which ends the job in the service"""
+        self.connection.close()
 
 
-def run_udf(code: str, epsg_code: str, datacube_list: List[DataCube]) -> UdfData:
-    """Run the user defined code (udf) and  create the required input for the function
+def parse_address(address: str) -> Tuple[str, int]:
+    """Split a host:port address"""
+    host, port = address.rsplit(":", 1)
+    return host, int(port)
 
-    :param code: The UDF code
-    :param epsg_code: The EPSG code of the projection
-    :param datacube: The id of the strds
-    :return: The resulting udf data object
+
+def task_authkey() -> bytes:
+    """Return the key that authenticates the coordinator and its workers
+
+    The key is set with the GRASS_UDF_AUTHKEY environment variable, a random key
+    that only the local workers know is created if it is not set.
+    """
+    if not os.environ.get("GRASS_UDF_AUTHKEY"):
+        os.environ["GRASS_UDF_AUTHKEY"] = secrets.token_hex(16)
+    return os.environ["GRASS_UDF_AUTHKEY"].encode()
+
+
+def service_authkey(address: str, create: bool = False) -> Optional[bytes]:
+    """Return the key that authenticates the clients of the UDF service
+
+    The key is set with the GRASS_UDF_AUTHKEY environment variable, like for the
+    coordinator. If it is not set, the service creates a random key in a file next to
+    its socket that only the user can read, from which the clients read the key.
+
+    :param address: The Unix socket of the service
+    :param create: Create the key file, which is done by the service
+    :return: The key, None if a client finds no key
     """
+    if os.environ.get("GRASS_UDF_AUTHKEY"):
+        return os.environ["GRASS_UDF_AUTHKEY"].encode()
+
+    path = address + ".key"
+    if create:
+        if os.path.exists(path):
+            os.remove(path)
+        key = secrets.token_hex(16)
+        with os.fdopen(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600), "w") as key_file:
+            key_file.write(key)
+        return key.encode()
 
-    data = UdfData(proj={"EPSG": epsg_code}, datacube_list=datacube_list)
+    try:
+        with open(path, "r") as key_file:
+            return key_file.read().strip().encode()
+    except OSError:
+        return None
 
-    return run_user_code(code=code, data=data)
+
+def run_task_worker(address: str):
+    """Process the row ranges of a coordinator until it stops
+
+    Each row range is processed by running t.rast.udf with the options of the task
+    in the region of the rows, which writes the partial raster maps of the rows.
+
+    :param address: The host:port address of the coordinator
+    """
+    mapset = gcore.gisenv()["MAPSET"]
+    with Client(parse_address(address), authkey=task_authkey()) as connection:
+        connection.send(("ready", None))
+        while True:
+            message = connection.recv()
+            if message[0] == "stop":
+                return
+
+            task = message[1]
+            gcore.verbose(_("Processing the rows %i to %i") % (task["first"], task["last"]))
+            env = os.environ.copy()
+            env["GRASS_REGION"] = task["region"]
+            process = gcore.start_command("t.rast.udf", flags=task["flags"], overwrite=True, quiet=True,
+                                          env=env, stderr=subprocess.PIPE, **task["options"])
+            _stdout, stderr = process.communicate()
+            connection.send(("done", (task["id"], process.returncode, gcore.decode(stderr)[-4000:], mapset)))
+
+
+class TaskCoordinator:
+    """Distribute row ranges of the region to worker processes over TCP
+
+    The tasks are served from a queue to all workers that connect, each worker
+    connection is served by its own thread. A task of a worker whose connection
+    is lost is queued again, the other workers wait for queued tasks until all
+    tasks are processed.
+    """
+
+    def __init__(self, address: str, tasks: List[Dict]):
+
+        self.address = parse_address(address)
+        self.tasks = tasks
+        self.queue = queue.Queue()
+        for task in tasks:
+            self.queue.put(task)
+        self.mapsets: Dict[int, str] = {}
+        self.errors: List[str] = []
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+
+    def serve_worker(self, connection):
+        """Send tasks to a worker until all tasks are processed"""
+        with connection:
+            try:
+                connection.recv()
+                while not self.finished.is_set():
+                    # Tasks of lost workers may be queued again while others are processed
+                    try:
+                        task = self.queue.get(timeout=0.5)
+                    except queue.Empty:
+                        continue
+
+                    try:
+                        connection.send(("task", task))
+                        id, returncode, stderr, mapset = connection.recv()[1]
+                    except (EOFError, OSError):
+                        self.queue.put(task)
+                        return
+
+                    with self.lock:
+                        if returncode != 0:
+                            self.errors.append(stderr)
+                        self.mapsets[id] = mapset
+                        if self.errors or len(self.mapsets) == len(self.tasks):
+                            self.finished.set()
+                connection.send(("stop", None))
+            except (EOFError, OSError):
+                pass
+
+    def run(self, workers: int = 0) -> Dict[int, str]:
+        """Serve the tasks until all are processed
+
+        :param workers: The number of local worker processes to start
+        :return: The dictionary of the mapsets of the partial raster maps of the tasks
+        """
+        authkey = task_authkey()
+        listener = Listener(self.address, authkey=authkey)
+        host, port = listener.address
+        gcore.message(_("Coordinator is listening at <%s:%i> for %i row ranges") % (host, port, len(self.tasks)))
+
+        def accept():
+            while not self.finished.is_set():
+                try:
+                    connection = listener.accept()
+                except (OSError, EOFError):
+                    return
+                threading.Thread(target=self.serve_worker, args=(connection,), daemon=True).start()
+
+        threading.Thread(target=accept, daemon=True).start()
+
+        processes = [gcore.start_command("t.rast.udf", flags="w", coordinator=f"{host}:{port}", quiet=True)
+                     for _count in range(workers)]
+
+        while not self.finished.wait(1.0):
+            if processes and all(process.poll() is not None for process in processes):
+                self.errors.append(_("All local worker processes exited"))
+                break
+
+        listener.close()
+        for process in processes:
+            process.wait()
+
+        if self.errors:
+            gcore.fatal(_("Processing the row ranges failed:\n%s") % self.errors[0])
+
+        return self.mapsets
+
+
+def create_tasks(region: Region, nrows: int, taskrows: int, workers: int, options: Dict,
+                 flags: str, blocks: Optional[List[Tuple[int, int, int, int]]] = None,
+                 outside: Optional[set] = None) -> List[Dict]:
+    """Split the region into row ranges that are processed by the workers
+
+    Row ranges in which all blocks are outside of the area of interest are not
+    processed, their blocks are written as null cells by the coordinator.
+
+    :param region: The GRASS GIS Region
+    :param nrows: The number of rows of a block, the row ranges are multiples of it
+    :param taskrows: The number of rows of a row range, computed for four ranges per worker if 0
+    :param workers: The number of workers
+    :param options: The options of t.rast.udf for the workers, the basenames get the task id as suffix
+    :param flags: The flags of t.rast.udf for the workers
+    :param blocks: The list of (index, usable_rows, col, usable_cols) tuples of the blocks
+    :param outside: The set of (index, col) tuples of the blocks outside of the area of interest
+    :return: The list of tasks
+    """
+    if taskrows <= 0:
+        taskrows = int(math.ceil(region.rows / (4 * max(workers, 1))))
+    taskrows = max(nrows, int(math.ceil(taskrows / nrows)) * nrows)
+
+    tasks = []
+    for id, first in enumerate(range(0, region.rows, taskrows)):
+        last = min(first + taskrows, region.rows)
+        if outside and all((block[0], block[2]) in outside for block in blocks if first <= block[0] < last):
+            continue
+        task_options = dict(options)
+        task_options["basename"] = ",".join(basename + f"_part{id}" for basename in options["basename"].split(","))
+        tasks.append({"id": id, "first": first, "last": last, "flags": flags, "options": task_options,
+                      "region": gcore.region_env(n=region.north - first * region.nsres,
+                                                 s=region.north - last * region.nsres,
+                                                 e=region.east, w=region.west,
+                                                 nsres=region.nsres, ewres=region.ewres)})
+    return tasks
+
+
+def patch_blocks(blocks, tasks: List[Dict], mapsets: Dict[int, str], outputs: List["OutputEntry"],
+                 region: Region, mtype: str, profiler: Optional[Profiler] = None, outside: Optional[set] = None):
+    """Read the results of the blocks from the partial raster maps of the tasks
+
+    The partial raster maps are read in the full region, so that the rows of a
+    task are at the same rows as in the output maps.
+
+    :param blocks: The list of (index, usable_rows, col, usable_cols) tuples of the blocks
+    :param tasks: The tasks, ordered by their rows
+    :param mapsets: The mapsets of the partial raster maps of the tasks
+    :param outputs: The output entries with the output maps of the current window
+    :param region: The GRASS GIS Region
+    :param mtype: The map type of the output maps
+    :param profiler: The profiler of the patch stage
+    :param outside: The set of (index, col) tuples of the blocks outside of the area of interest,
+                    their result is None
+    :return: A generator of blocks with the results set
+    """
+    profiler = profiler or Profiler()
+    handles = RasterHandlePool(maxopen=0)
+    row = Buffer(shape=(region.cols,), mtype=mtype)
+    task = None
+
+    for index, usable_rows, col, usable_cols in blocks:
+        if outside and (index, col) in outside:
+            block = Block(index=index, usable_rows=usable_rows, col=col, usable_cols=usable_cols)
+            block.all_null = True
+            yield block
+            continue
+
+        if task is None or index >= task["last"]:
+            # The partial maps of the previous task are not needed anymore
+            handles.close()
+            task = next(candidate for candidate in tasks if candidate["first"] <= index < candidate["last"])
+
+        block = Block(index=index, usable_rows=usable_rows, col=col, usable_cols=usable_cols)
+        with profiler.stage("patch", rows=usable_rows):
+            block.result = []
+            for entry in outputs:
+                output_maps = entry.writer.open_output_maps
+                array = np.empty(shape=(len(output_maps), usable_rows, usable_cols), dtype=RTYPE[mtype]['numpy'])
+                for tindex, output_map in enumerate(output_maps):
+                    name = entry.basename + f"_part{task['id']}" + output_map.name[len(entry.basename):]
+                    rmap = handles.get(f"{name}@{mapsets[task['id']]}")
+                    for n in range(usable_rows):
+                        rmap.get_row(index + n, row)
+                        array[tindex, n] = row[col:col + usable_cols]
+                block.result.append(array)
+            block.tcoords = [None] * len(outputs)
+
+        yield block
+
+    handles.close()
+
+
+class PipelineError:
+    """An exception raised in the background stage of a pipeline, re-raised by the consumer"""
+
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def pipeline_blocks(blocks, stage, size: int):
+    """Run the compute stage of the block processing in a background thread
+
+    libraster is not thread safe, opening a map may reallocate its global file table.
+    Hence the blocks are read in the calling thread, which also writes the results
+    that are yielded, while only the stage that computes the results runs in the
+    background. The compute stage overlaps with the reading and writing of the blocks.
+
+    :param blocks: The iterable of read blocks, it is consumed in the calling thread
+    :param stage: The function that is called with an iterable of blocks as keyword argument
+                  blocks and returns a generator of the computed blocks in block order
+    :param size: The maximum number of read blocks that are waiting for the stage
+    :return: A generator of the computed blocks
+    """
+    inputs = queue.Queue(maxsize=size)
+    results = queue.Queue()
+    done = object()
+
+    def source():
+        while True:
+            block = inputs.get()
+            if block is done:
+                return
+            yield block
+
+    def compute():
+        try:
+            for block in stage(blocks=source()):
+                results.put(block)
+        except BaseException as e:
+            results.put(PipelineError(e))
+        results.put(done)
+
+    def computed(wait: bool):
+        while True:
+            try:
+                item = results.get(block=wait)
+            except queue.Empty:
+                return
+            if item is done:
+                return
+            if isinstance(item, PipelineError):
+                raise item.error
+            yield item
+
+    def feed(item):
+        # The stage does not accept more blocks if it failed
+        while thread.is_alive():
+            try:
+                inputs.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    thread = threading.Thread(target=compute, daemon=True)
+    thread.start()
+
+    for block in blocks:
+        feed(block)
+        # The results are consumed, while the stage computes the next blocks
+        yield from computed(wait=False)
+    feed(done)
+
+    yield from computed(wait=True)
+    thread.join()
+
+
+class BlockWriter:
+    """Write the results of the blocks row by row into the output raster maps
+
+    The blocks must be provided in block order. The result of a block is copied at
+    once into a band buffer of the output map type, whose rows are bound to pygrass
+    Buffers that are passed to Rast_put_row() without any further allocation or copy.
+    The results of tiles are assembled in the band buffer, which is written when the
+    last tile of the band arrived.
+    """
+
+    def __init__(self, open_output_maps: List[RasterRow], region: Region, mtype: str,
+                 profiler: Optional[Profiler] = None, checkpoint: Optional["Checkpoint"] = None):
+
+        self.open_output_maps = open_output_maps
+        self.region = region
+        self.mtype = mtype
+        self.band: Optional[BlockBuffer] = None
+        self.profiler = profiler or Profiler()
+        self.checkpoint = checkpoint
+
+    def write(self, block: Block, array: Optional[np.ndarray]):
+        """Write the result of a block, null cells are written if the block has no result
+
+        :param block: The block the result was computed for
+        :param array: The (t, y, x) or (y, x) result array, None to write null cells
+        """
+        # The first block has the largest number of rows
+        if self.band is None or self.band.nrows < block.usable_rows:
+            self.band = BlockBuffer(ntimes=len(self.open_output_maps), nrows=block.usable_rows,
+                                    ncols=self.region.cols, mtype=self.mtype)
+
+        target = self.band.array[:, :block.usable_rows, block.col:block.col + block.usable_cols]
+
+        if array is None:
+            target.fill(null_value(self.mtype))
+        else:
+            # Two dimensions
+            if array.ndim == 2:
+                array = array[np.newaxis]
+
+            if array.shape[0] != len(self.open_output_maps):
+                gcore.fatal(_("The user defined function returned %i slices, but %i output maps were created")
+                            % (array.shape[0], len(self.open_output_maps)))
+
+            # NaN has no defined integer value, the null cells of float results are set explicitly
+            if self.mtype == "CELL" and array.dtype.kind == "f":
+                array = np.where(np.isfinite(array), array, CELL_NULL)
+            # The null cells of integer results are plain integers that are cast into valid float cells
+            elif self.mtype != "CELL" and array.dtype.kind == "i":
+                array = np.where(array != CELL_NULL, array, np.nan)
+
+            np.copyto(target, array, casting="unsafe")
+
+        if block.col + block.usable_cols == self.region.cols:
+            self.write_rows(block.usable_rows)
+
+    def write_rows(self, usable_rows: int):
+        """Write the first usable_rows rows of the band buffer into the output raster maps
+
+        :param usable_rows: The number of rows to write
+        """
+        nbytes = self.band.view(usable_rows).nbytes
+        with self.profiler.stage("write", nbytes=nbytes, rows=usable_rows):
+            for rows, output_map in zip(self.band.rows, self.open_output_maps):
+                for n in range(usable_rows):
+                    # Write the result into the output raster map
+                    output_map.put_row(rows[n])
+
+            if self.checkpoint is not None:
+                self.checkpoint.append(open_output_maps=self.open_output_maps, band=self.band.view(usable_rows))
+
+
+class OutputEntry:
+    """An output STRDS with the raster maps of the slices of one resulting data cube
+
+    In window mode the raster maps of all temporal windows are collected, the maps
+    of the current window are written by the block writer. Only the maps of the
+    current window are open, the maps of the completed windows are closed and
+    only their ids and start times are kept.
+    """
+
+    def __init__(self, name: str, basename: str):
+
+        self.name = name
+        self.basename = basename
+        self.map_ids: List[str] = []
+        self.result_start_times = []
+        self.writer: Optional[BlockWriter] = None
+        self.window_start_times = None
+        self.first = False
+
+    def open(self, num_output_maps: int, mtype: str, mapset: str, region: Region,
+             profiler: Optional[Profiler] = None, suffix: str = "", start_time=None,
+             checkpoint: Optional["Checkpoint"] = None):
+        """Open the output raster maps of the next window for writing
+
+        :param num_output_maps: The number of slices of the resulting data cube
+        :param mtype: The map type of the output raster maps
+        :param mapset: The current mapset
+        :param region: The GRASS GIS Region
+        :param profiler: The profiler of the write stage
+        :param suffix: The suffix of the basename of the maps of this window
+        :param start_time: The start time of the maps if the resulting data cube has no time axis,
+                           the current time is used if None
+        :param checkpoint: The checkpoint that saves the written rows
+        """
+        if num_output_maps == 1:
+            output_map = RasterRow(name=self.basename + suffix)
+            output_map.open(mode="w", mtype=mtype, overwrite=gcore.overwrite())
+            window_maps = [output_map]
+        elif num_output_maps > 1:
+            window_maps = []
+            for index in range(num_output_maps):
+                output_map = RasterRow(name=self.basename + suffix + f"_{index}", mapset=mapset)
+                output_map.open(mode="w", mtype=mtype, overwrite=gcore.overwrite())
+                window_maps.append(output_map)
+        else:
+            gcore.fatal(_("No result generated for <%s>") % self.name)
+
+        self.writer = BlockWriter(open_output_maps=window_maps, region=region, mtype=mtype,
+                                  profiler=profiler, checkpoint=checkpoint)
+        # Workaround because time reduction will remove the timestamp
+        self.window_start_times = [start_time if start_time is not None else datetime.now()]
+        self.first = False
+
+    def write(self, block: Block, array: Optional[np.ndarray], tcoords: Optional[xarray.DataArray]):
+        """Write the result of a block, the time coordinates of the first result are kept
+
+        :param block: The block the result was computed for
+        :param array: The (t, y, x) or (y, x) result array, None to write null cells
+        :param tcoords: The time coordinates of the result, a data array or its numpy array
+        """
+        if array is not None and self.first is False:
+            if tcoords is not None:
+                self.window_start_times = tcoords
+            self.first = True
+
+        self.writer.write(block, array)
+
+    def window_times(self) -> List:
+        """Return the start times of the maps of the current window"""
+        window_start_times = self.window_start_times
+        # The time coordinates of the data cubes or their numpy arrays
+        if hasattr(window_start_times, "values"):
+            window_start_times = window_start_times.values
+
+        times = []
+        for count in range(len(self.writer.open_output_maps)):
+            start_time = window_start_times[count]
+            if isinstance(start_time, np.datetime64):
+                start_time = start_time.astype("datetime64[us]").item()
+            elif isinstance(start_time, np.generic):
+                start_time = start_time.item()
+            times.append(start_time)
+        return times
+
+    def close_window(self, restored: bool = False):
+        """Close the maps of the current window and collect their ids and start times
+
+        :param restored: True if the window was restored from a checkpoint, which
+                         restored the start times of its maps as well
+        """
+        if not restored:
+            self.result_start_times.extend(self.window_times())
+        for output_map in self.writer.open_output_maps:
+            output_map.close()
+            self.map_ids.append(output_map.fullname())
+        if self.writer.checkpoint is not None:
+            self.writer.checkpoint.close_files(self.writer.open_output_maps)
+
+
+def encode_times(times: Optional[List]) -> Optional[List]:
+    """Convert a list of absolute or relative times into JSON values"""
+    if times is None:
+        return None
+    return [value.isoformat() if isinstance(value, datetime) else value for value in times]
+
+
+def decode_times(values: Optional[List]) -> Optional[List]:
+    """Convert the JSON values of encode_times() back into times"""
+    if values is None:
+        return None
+    return [datetime.fromisoformat(value) if isinstance(value, str) else value for value in values]
+
+
+class Checkpoint:
+    """Save the written rows of the output maps, so that an interrupted job can be resumed
+
+    The rows of each output map are appended to a scratch file in the checkpoint
+    directory after they were written. When all outputs of a band of rows were
+    written, the number of completed rows and the start times of the outputs are
+    saved in a manifest, at most once in interval seconds, since the scratch files
+    are synchronized to disk for each manifest. A job is resumed only if the manifest
+    was saved for the same inputs, outputs, map types, region and UDF.
+    """
+
+    def __init__(self, directory: str, key: Dict, interval: float = 10.0):
+
+        self.directory = directory
+        self.key = key
+        self.interval = interval
+        self.last_save = time.monotonic()
+        self.manifest_file = os.path.join(directory, "manifest.json")
+        self.files = {}
+        # The names of the output maps whose saved rows were restored
+        self.restored = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name: str) -> str:
+        """Return the scratch file of an output map"""
+        return os.path.join(self.directory, name + ".bin")
+
+    def load(self) -> Optional[Dict]:
+        """Return the manifest of the interrupted job, the checkpoint is cleared if there is none
+
+        :return: The manifest or None if the job can not be resumed
+        """
+        if os.path.exists(self.manifest_file):
+            with open(self.manifest_file, "r") as manifest_file:
+                manifest = json.load(manifest_file)
+            if manifest["key"] == self.key:
+                return manifest
+            gcore.warning(_("The checkpoint in <%s> was saved for another job and is removed") % self.directory)
+
+        self.clear()
+        return None
+
+    def restore(self, output_map: RasterRow, rows: int, ncols: int, mtype: str):
+        """Write the saved rows of an output map into the newly opened map
+
+        The scratch file is truncated to the saved rows, rows that were appended
+        after the last manifest was saved are written again.
+
+        :param output_map: The output raster map open for writing
+        :param rows: The number of saved rows
+        :param ncols: The number of columns of the region
+        :param mtype: The map type of the output map
+        """
+        if rows == 0:
+            return
+
+        path = self.path(output_map.name)
+        self.restored.add(output_map.name)
+        dtype = np.dtype(RTYPE[mtype]['numpy'])
+        saved = np.fromfile(path, dtype=dtype, count=rows * ncols).reshape(rows, ncols)
+        os.truncate(path, saved.nbytes)
+
+        row = Buffer(shape=(ncols,), mtype=mtype)
+        for n in range(rows):
+            row[:] = saved[n]
+            output_map.put_row(row)
+
+    def append(self, open_output_maps: List[RasterRow], band: np.ndarray):
+        """Append the (t, y, x) rows of a band to the scratch files of the output maps
+
+        The scratch files of maps without restored rows are truncated, they may contain
+        rows that were appended after the last manifest was saved.
+        """
+        for array, output_map in zip(band, open_output_maps):
+            if output_map.name not in self.files:
+                mode = "ab" if output_map.name in self.restored else "wb"
+                self.files[output_map.name] = open(self.path(output_map.name), mode)
+            self.files[output_map.name].write(array.tobytes())
+
+    def close_files(self, output_maps: List[RasterRow]):
+        """Close the scratch files of the output maps of a completed window"""
+        for output_map in output_maps:
+            scratch_file = self.files.pop(output_map.name, None)
+            if scratch_file is not None:
+                scratch_file.close()
+
+    def save(self, window: int, rows: int, num_output_maps: List[int], outputs: List[OutputEntry],
+             force: bool = False):
+        """Save the manifest after the rows of all outputs were appended
+
+        The manifest is not saved if the last manifest was saved less than interval
+        seconds ago, an interrupted job then recomputes the rows written since then.
+
+        :param window: The index of the current temporal window
+        :param rows: The number of completed rows of the current window
+        :param num_output_maps: The number of maps of each output of a window
+        :param outputs: The output entries
+        :param force: Save the manifest regardless of the interval
+        """
+        now = time.monotonic()
+        if not force and now - self.last_save < self.interval:
+            return
+        self.last_save = now
+
+        for scratch_file in self.files.values():
+            scratch_file.flush()
+            os.fsync(scratch_file.fileno())
+
+        manifest = {"key": self.key, "window": window, "rows": rows, "num_output_maps": num_output_maps,
+                    "outputs": [{"start_times": encode_times(entry.result_start_times),
+                                 "window_start_times": encode_times(entry.window_times()) if entry.first else None}
+                                for entry in outputs]}
+
+        # The manifest is replaced at once, so that an interruption keeps the last manifest
+        with open(self.manifest_file + ".tmp", "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(self.manifest_file + ".tmp", self.manifest_file)
+
+    def clear(self):
+        """Remove the manifest and the scratch files"""
+        for scratch_file in self.files.values():
+            scratch_file.close()
+        self.files = {}
+
+        for name in os.listdir(self.directory):
+            if name == "manifest.json" or name.endswith(".bin"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def existing_map_ids(dbif: SQLDatabaseInterfaceConnection, map_ids: List[str]) -> set:
+    """Return the ids of the raster maps that are already registered in the temporal database
+
+    :param dbif: The database interface
+    :param map_ids: The ids of the raster maps to check
+    :return: The set of the ids that are registered
+    """
+    if not map_ids:
+        return set()
+
+    dbif.execute("SELECT id FROM raster_base WHERE id IN (%s)" % ",".join("'%s'" % id for id in map_ids))
+    return {row[0] for row in dbif.fetchall()}
+
+
+def register_output_maps(output: str, input_strds: List[StrdsEntry], map_ids: List[str],
+                         result_start_times, dbif: SQLDatabaseInterfaceConnection, print_info: bool = False):
+    """Insert the closed output raster maps into the temporal database and register them in a new STRDS
+
+    Each raster map is loaded once. The maps that are already in the temporal database
+    are looked up with a single query, all maps are inserted or updated in a single
+    transaction and registered in the new STRDS, whose extent and metadata are updated
+    once after all maps were registered.
+
+    :param output: The name of the output STRDS
+    :param input_strds: The list of input strds
+    :param map_ids: The ids of the closed output raster maps
+    :param result_start_times: The start times of the output raster maps
+    :param dbif: The database interface
+    :param print_info: Print the metadata of the output raster maps
+    """
+    # Create new STRDS
+    new_sp = open_new_stds(name=output, type="strds",
+                           temporaltype=input_strds[0].strds.get_temporal_type(),
+                           title="new STRDS",
+                           descr="New STRDS from UDF",
+                           semantic="UDF",
+                           overwrite=gcore.overwrite(),
+                           dbif=dbif)
+
+    maps_to_register = []
+    for count, map_id in enumerate(map_ids):
+        print(map_id)
+        rd = RasterDataset(map_id)
+        if input_strds[0].strds.is_time_absolute():
+            rd.set_absolute_time(start_time=result_start_times[count])
+        elif input_strds[0].strds.is_time_relative():
+            rd.set_relative_time(start_time=result_start_times[count], end_time=None, unit="seconds")
+        rd.load()
+        maps_to_register.append(rd)
+
+    existing_ids = existing_map_ids(dbif=dbif, map_ids=[rd.get_id() for rd in maps_to_register])
+
+    statement = ""
+    for rd in maps_to_register:
+        if rd.get_id() in existing_ids:
+            statement += rd.update(dbif=dbif, execute=False)
+        else:
+            statement += rd.insert(dbif=dbif, execute=False)
+    dbif.execute_transaction(statement)
+
+    if print_info:
+        for rd in maps_to_register:
+            rd.print_info()
+
+    # The loaded maps are registered directly, register_map_object_list() would write
+    # them to a file and load and query each map again
+    for rd in maps_to_register:
+        new_sp.register_map(map=rd, dbif=dbif)
+
+    # The extent and metadata of the STRDS are updated once for all maps
+    new_sp.update_from_registered_maps(dbif=dbif)
+    new_sp.update_command_string(dbif=dbif)
 
 
 ############################################################################
@@ -229,20 +2475,83 @@ def main():
 
     # Get the options
     inputs = options["inputs"]
-    output = options["output"]
-    basename = options["basename"]
+    output_names = options["output"].split(",")
+    basenames = options["basename"].split(",")
     where = options["where"]
     pyfile = options["pyfile"]
+    reducer = Reducer(options["reducer"]) if options["reducer"] else None
     nrows = int(options["nrows"])
+    nprocs = int(options["nprocs"])
+    tilecols = int(options["tilecols"])
+    tilerows = int(options["tilerows"])
+    pipeline = flags["p"]
+    skip_null = flags["n"]
+    print_info = flags["i"]
+    engine = options["engine"]
+    nslices = [int(n) for n in options["nslices"].split(",")]
+    window = int(options["window"])
+    step = int(options["step"])
+    maxopen = int(options["maxopen"])
+    memory = int(options["memory"]) if options["memory"] else 0
+    profile_file = options["profile"]
+    trace_file = options["trace"]
+    address = options["service"]
+    checkpoint_dir = options["checkpoint"]
+    cache_dir = options["cache"]
+    cachesize = int(options["cachesize"])
+    ctype = options["ctype"] or None
+    aoi = options["aoi"]
+    aoi_raster = options["aoiraster"]
+    bbox = [float(value) for value in options["bbox"].split(",")] if options["bbox"] else None
+
+    coordinator = options["coordinator"]
+    workers = int(options["workers"])
+    raster_only = flags["r"]
+
+    if flags["w"]:
+        if not coordinator:
+            gcore.fatal(_("The address of the coordinator must be set to run as worker"))
+        run_task_worker(coordinator)
+        return
+
+    if flags["s"]:
+        if not address:
+            gcore.fatal(_("The socket of the UDF service must be set to start the service"))
+        import_udf_modules()
+        UdfService(address).serve()
+        return
 
     input_name_list = inputs.split(",")
 
+    if len(basenames) != len(output_names):
+        gcore.fatal(_("A basename must be provided for each output space time raster dataset"))
+
+    outputs = [OutputEntry(name=name, basename=basename) for name, basename in zip(output_names, basenames)]
+
     input_strds: List[StrdsEntry] = []
 
-    # Import the python code into the current function context
-    code = open(pyfile, "r").read()
-    projection_kv = gcore.parse_command("g.proj", flags="g")
-    epsg_code = projection_kv["epsg"]
+    # In tile mode the blocks are tilerows x tilecols large
+    if tilecols > 0:
+        if nrows != 1:
+            gcore.warning(_("The number of rows is ignored in tile mode, the tiles have tilerows rows"))
+        nrows = tilerows if tilerows > 0 else tilecols
+        ncols = tilecols
+    elif tilerows > 0:
+        gcore.fatal(_("The number of tile columns must be set for tile processing."))
+    else:
+        ncols = None
+
+    if reducer is not None:
+        # The reducers return a single slice for each input strds
+        nslices = [1] * len(outputs)
+        if nprocs > 1:
+            gcore.warning(_("The reducer runs in a single process, nprocs is ignored"))
+            nprocs = 1
+    else:
+        # Import the python code into the current function context
+        code = open(pyfile, "r").read()
+        projection_kv = gcore.parse_command("g.proj", flags="g")
+        epsg_code = projection_kv["epsg"]
 
     tgis.init()
     mapset = gcore.gisenv()["MAPSET"]
@@ -251,8 +2560,9 @@ def main():
     dbif.connect()
 
     region = Region()
+    grid = RegionGrid(region)
+    handles = RasterHandlePool(maxopen=maxopen)
     num_input_maps = 0
-    open_output_maps = []
 
     for input_name in input_name_list:
         sp = tgis.open_old_stds(input_name, "strds", dbif)
@@ -266,8 +2576,13 @@ def main():
             dbif.close()
             gcore.fatal(_("Number of rows for the udf must be greater 0."))
 
+        if nprocs < 1:
+            dbif.close()
+            gcore.fatal(_("Number of processes must be greater 0."))
+
         num_input_maps = len(map_list)
-        input_strds.append(StrdsEntry(dbif=dbif, strds=sp, map_list=map_list, region=region))
+        input_strds.append(StrdsEntry(dbif=dbif, strds=sp, map_list=map_list, region=region,
+                                      nrows=nrows, ncols=ncols, grid=grid, handles=handles, ctype=ctype))
 
     for strds in input_strds:
         if len(strds.map_list) != num_input_maps:
@@ -278,111 +2593,285 @@ def main():
     mtype = None
     for strds in input_strds:
         strds.setup()
-        mtype = strds.mtype
+        mtype = strds.ctype
 
-    num_output_maps = count_resulting_maps(input_strds=input_strds, code=code, epsg_code=epsg_code)
+    # The output maps have the map type of the data cubes, unless it is set
+    if options["mtype"]:
+        mtype = options["mtype"]
 
-    if num_output_maps == 1:
-        output_map = RasterRow(name=basename)
-        output_map.open(mode="w", mtype=mtype, overwrite=gcore.overwrite())
-        open_output_maps.append(output_map)
-    elif num_output_maps > 1:
-        for index in range(num_output_maps):
-            output_map = RasterRow(name=basename + f"_{index}", mapset=mapset)
-            output_map.open(mode="w", mtype=mtype, overwrite=gcore.overwrite())
-            open_output_maps.append(output_map)
-    else:
-        dbif.close()
-        gcore.fatal(_("No result generated") % input)
+    find_duplicates(input_strds=input_strds)
 
-    # Workaround because time reduction will remove the timestamp
-    result_start_times = [datetime.now()]
-    first = False
+    if coordinator and checkpoint_dir:
+        dbif.close()
+        gcore.fatal(_("Checkpoints are not supported by the coordinator"))
 
-    # Read several rows for each map of each input strds and load them into the udf
-    for index in range(0, region.rows, nrows):
-        if index + nrows > region.rows:
-            usable_rows = index + nrows - region.rows + 1
-        else:
-            usable_rows = nrows
+    if step < 1:
+        dbif.close()
+        gcore.fatal(_("The step of the temporal windows must be greater 0."))
 
-        # Read all input strds as cubes
-        datacubes = []
+    # The cubes of the input strds are read from the cache as memory mapped files
+    # The coordinator reads the partial maps of the workers and no input maps
+    if cache_dir and not coordinator:
+        cache = CubeCache(directory=cache_dir, maxsize=cachesize)
         for strds in input_strds:
-            datacube = strds.to_datacube(index=index, usable_rows=usable_rows)
-            datacubes.append(datacube)
+            if strds.duplicate_of is None:
+                strds.cube = cache.load(strds=strds, region=region)
 
-        # Run the UDF code
-        data = run_udf(code=code, epsg_code=epsg_code, datacube_list=datacubes)
-
-        # Read only the first cube
-        datacubes = data.get_datacube_list()
-        first_cube_array: xarray.DataArray = datacubes[0].get_array()
-
-        if first is False:
-            if 't' in first_cube_array.coords:
-                result_start_times = first_cube_array.coords['t']
-
-        # Three dimensions
-        if first_cube_array.ndim == 3:
-            for count, slice in enumerate(first_cube_array):
-                output_map = open_output_maps[count]
-                # print(f"Write slice at index {index} \n{slice} for map {output_map.name}")
-                for row in slice:
-                    # Write the result into the output raster map
-                    b = Buffer(shape=(region.cols,), mtype=mtype)
-                    b[:] = row[:]
-                    output_map.put_row(b)
-        # Two dimensions
-        elif first_cube_array.ndim == 2:
-            output_map = open_output_maps[0]
-            # print(f"Write slice at index {index} \n{slice} for map {output_map.name}")
-            for row in first_cube_array:
-                # Write the result into the output raster map
-                b = Buffer(shape=(region.cols,), mtype=mtype)
-                b[:] = row[:]
-                output_map.put_row(b)
-
-        first = True
+    # Only the maps of a temporal window are read at once
+    windows = create_windows(num_maps=num_input_maps, window=window, step=step)
+    for strds in input_strds:
+        strds.set_window(*windows[0])
+    if len(windows) > 1:
+        gcore.message(_("Processing %i temporal windows of %i maps") % (len(windows), window))
+
+    # Compute the number of rows of the blocks from the memory budget
+    if memory > 0:
+        nrows = min(compute_nrows(input_strds=input_strds, ncols=ncols if ncols is not None else region.cols,
+                                  memory=memory, nprocs=nprocs, pipeline=pipeline,
+                                  band_cols=region.cols if ncols is not None else 0), region.rows)
+        for strds in input_strds:
+            strds.nrows = nrows
+        gcore.message(_("Using blocks of %i rows to process the data cubes within %i MB of memory")
+                      % (nrows, memory))
 
-    # Create new STRDS
-    new_sp = open_new_stds(name=output, type="strds",
-                           temporaltype=input_strds[0].strds.get_temporal_type(),
-                           title="new STRDS",
-                           descr="New STRDS from UDF",
-                           semantic="UDF",
-                           overwrite=gcore.overwrite(),
-                           dbif=dbif)
+    if reducer is not None and len(outputs) > len(input_strds):
+        dbif.close()
+        gcore.fatal(_("The reducer returns %i data cubes, but %i output space time raster "
+                      "datasets were provided") % (len(input_strds), len(outputs)))
+
+    profiler = Profiler(trace=bool(trace_file))
+    runner = None
+    service = None
+    if reducer is None and address:
+        connection = ServiceClient.connect(address)
+        if connection is None:
+            gcore.warning(_("UDF service at <%s> is not running, the UDF is run in this process") % address)
+        else:
+            service = ServiceClient(connection=connection, input_strds=input_strds, num_cubes=len(outputs))
+    if reducer is None and service is None:
+        import_udf_modules()
+        runner = UdfRunner(code=code, epsg_code=epsg_code, engine=engine, filename=pyfile)
+
+    checkpoint = None
+    resume = None
+    if checkpoint_dir:
+        key = {"inputs": [strds.strds.get_id() for strds in input_strds],
+               "maps": [[map.get_id() for map in strds.all_map_list] for strds in input_strds],
+               "outputs": output_names, "basenames": basenames,
+               "region": [region.north, region.south, region.east, region.west, region.rows, region.cols],
+               "udf": hashlib.sha256((reducer.name if reducer is not None else code).encode()).hexdigest(),
+               "nrows": nrows, "tilecols": tilecols, "window": window, "step": step,
+               "aoi": [aoi, aoi_raster, bbox], "mtype": mtype, "ctype": [strds.ctype for strds in input_strds]}
+        checkpoint = Checkpoint(directory=checkpoint_dir, key=key, interval=float(options["interval"]))
+        resume = checkpoint.load()
+        if resume is not None:
+            gcore.message(_("Resuming the job from window %i, row %i") % (resume["window"], resume["rows"]))
+            nslices = resume["num_output_maps"]
+            for entry, saved in zip(outputs, resume["outputs"]):
+                entry.result_start_times = decode_times(saved["start_times"])
 
-    maps_to_register = []
-    for count, output_map in enumerate(open_output_maps):
-        output_map.close()
-        print(output_map.fullname())
-        rd = RasterDataset(output_map.fullname())
-        if input_strds[0].strds.is_time_absolute():
-            if hasattr(result_start_times, "data"):
-                d = pandas.to_datetime(result_start_times.data[count])
-            else:
-                d = result_start_times[count]
-            rd.set_absolute_time(start_time=d)
-        elif input_strds[0].strds.is_time_relative():
-            if hasattr(result_start_times, "data"):
-                d = result_start_times.data[count]
+    # Read several rows for each map of each input strds and load them into the udf
+    outside = set()
+    if aoi or aoi_raster or bbox:
+        if aoi:
+            # The vector map is rasterized in the current region
+            aoi_raster = "tmp_t_rast_udf_aoi_%i" % os.getpid()
+            gcore.run_command("v.to.rast", input=aoi, output=aoi_raster, use="val", value=1,
+                              type="point,line,area", quiet=True)
+        band_columns = read_aoi_columns(region=region, nrows=nrows, raster=aoi_raster, bbox=bbox)
+        if aoi:
+            gcore.run_command("g.remove", flags="f", type="raster", name=aoi_raster, quiet=True)
+
+        all_blocks, outside = create_aoi_blocks(region=region, nrows=nrows, band_columns=band_columns,
+                                                tilecols=tilecols)
+        if len(outside) == len(all_blocks):
+            dbif.close()
+            gcore.fatal(_("The area of interest does not intersect the region"))
+        gcore.message(_("%i of %i blocks are outside of the area of interest and written as null cells")
+                      % (len(outside), len(all_blocks)))
+    else:
+        all_blocks = create_blocks(region=region, nrows=nrows, tilecols=tilecols)
+    num_blocks = 0
+    num_skipped = 0
+
+    for window_index, (start, stop) in enumerate(windows):
+        blocks = all_blocks
+        if window_index > 0:
+            for strds in input_strds:
+                strds.set_window(start, stop)
+        if service is not None:
+            service.setup(code=code, epsg_code=epsg_code, engine=engine, filename=pyfile, grid=grid)
+
+        # The windows and rows that were completed by the interrupted job are restored
+        restored_rows = 0
+        if resume is not None and window_index <= resume["window"]:
+            restored_rows = region.rows if window_index < resume["window"] else resume["rows"]
+            blocks = [block for block in all_blocks if block[0] >= restored_rows]
+
+        # We need to know the number of slices that are returned from the udf to open the output maps,
+        # so the first block is computed upfront, unless the numbers were provided
+        probe = []
+        if window_index == 0:
+            if all(n > 0 for n in nslices):
+                if len(nslices) != len(outputs):
+                    dbif.close()
+                    gcore.fatal(_("The number of slices must be provided for each output space time "
+                                  "raster dataset"))
+                num_output_maps = nslices
             else:
-                d = result_start_times[count]
-            rd.set_relative_time(start_time=d, end_time=None, unit="seconds")
-        rd.load()
-        if rd.is_in_db(dbif=dbif):
-            rd.update(dbif=dbif)
+                # The first block inside of the area of interest is probed, it is only kept
+                # if it is the first block that is written
+                first = [(block[0], block[2]) not in outside for block in blocks].index(True)
+                probe_block = probe_first_block(input_strds=input_strds, blocks=blocks[first:], runner=runner,
+                                                grid=grid, num_cubes=len(outputs), profiler=profiler,
+                                                service=service)
+                num_output_maps = [count_slices(array) for array in probe_block.result]
+                if first == 0:
+                    probe = [probe_block]
+                    blocks = blocks[1:]
+                else:
+                    release_block(input_strds=input_strds, block=probe_block)
+
+            if len(num_output_maps) < len(outputs):
+                dbif.close()
+                gcore.fatal(_("The user defined function returned %i data cubes, but %i output space time "
+                              "raster datasets were provided") % (len(num_output_maps), len(outputs)))
+
+        # The maps of each window get the index of the window as suffix, even if only one window fits
+        if window > 0:
+            suffix = f"_{window_index}"
+            start_time = input_strds[0].start_times[0]
         else:
-            rd.insert(dbif=dbif)
-        maps_to_register.append(rd)
-        rd.print_info()
+            suffix = ""
+            start_time = None
+
+        for entry, num in zip(outputs, num_output_maps):
+            entry.open(num_output_maps=num, mtype=mtype, mapset=mapset, region=region, profiler=profiler,
+                       suffix=suffix, start_time=start_time, checkpoint=checkpoint)
+
+        # The workers process all windows of their rows, the coordinator patches their results
+        if coordinator and window_index == 0:
+            excluded = ("coordinator", "workers", "taskrows", "profile", "trace", "checkpoint", "interval")
+            task_options = {key: value for key, value in options.items() if value and key not in excluded}
+            task_options["nslices"] = ",".join(str(num) for num in num_output_maps[:len(outputs)])
+            task_options["mtype"] = mtype
+            task_flags = "r" + "".join(flag for flag in ("n", "p") if flags[flag])
+            tasks = create_tasks(region=region, nrows=nrows, taskrows=int(options["taskrows"]), workers=workers,
+                                 options=task_options, flags=task_flags, blocks=all_blocks, outside=outside)
+            with profiler.stage("tasks", rows=region.rows):
+                mapsets = TaskCoordinator(address=coordinator, tasks=tasks).run(workers=workers)
+
+        if restored_rows > 0:
+            for entry in outputs:
+                for output_map in entry.writer.open_output_maps:
+                    checkpoint.restore(output_map=output_map, rows=restored_rows, ncols=region.cols, mtype=mtype)
+
+            if window_index < resume["window"]:
+                # The start times of the completed windows were restored
+                for entry in outputs:
+                    entry.close_window(restored=True)
+                continue
+
+            for entry, saved in zip(outputs, resume["outputs"]):
+                if saved["window_start_times"] is not None:
+                    entry.window_start_times = decode_times(saved["window_start_times"])
+                    entry.first = True
+
+        pool = None
+        read = read_blocks(input_strds=input_strds, blocks=blocks, check_null=skip_null, profiler=profiler,
+                           outside=outside)
+
+        if coordinator:
+            # The partial maps of the workers are read in this thread, there is nothing to compute
+            results = patch_blocks(blocks=blocks, tasks=tasks, mapsets=mapsets, outputs=outputs,
+                                   region=region, mtype=mtype, profiler=profiler, outside=outside)
+        else:
+            if reducer is not None:
+                stage = partial(reduce_blocks, input_strds=input_strds, reducer=reducer,
+                                num_cubes=len(outputs), profiler=profiler)
+            elif service is not None:
+                stage = partial(service.run_blocks, profiler=profiler)
+            elif nprocs > 1:
+                # The pool is created in this thread, before the pipeline starts its thread
+                pool = create_worker_pool(input_strds=input_strds, runner=runner, grid=grid, nprocs=nprocs,
+                                          num_cubes=len(outputs))
+                stage = partial(run_blocks_parallel, pool=pool, nprocs=nprocs, profiler=profiler)
+            else:
+                stage = partial(run_blocks, input_strds=input_strds, runner=runner, grid=grid,
+                                num_cubes=len(outputs), profiler=profiler)
 
-    register_map_object_list(type="raster", map_list=maps_to_register, output_stds=new_sp, dbif=dbif)
+            if pipeline:
+                # Compute the results in a background thread while this thread reads and writes the blocks
+                results = pipeline_blocks(blocks=read, stage=stage, size=2)
+            else:
+                results = stage(blocks=read)
+
+        for block in chain(probe, results):
+            if block.result is None:
+                if (block.index, block.col) not in outside:
+                    num_skipped += 1
+                block.result = [None] * len(outputs)
+                block.tcoords = [None] * len(outputs)
+            elif len(block.result) < len(outputs):
+                gcore.fatal(_("The user defined function returned %i data cubes, but %i output space time raster "
+                              "datasets were provided") % (len(block.result), len(outputs)))
+
+            for entry, array, tcoords in zip(outputs, block.result, block.tcoords):
+                entry.write(block, array, tcoords)
+            release_block(input_strds=input_strds, block=block)
+
+            if checkpoint is not None and block.col + block.usable_cols == region.cols:
+                # A completed window is always saved, a resumed job does not recompute it
+                rows = block.index + block.usable_rows
+                checkpoint.save(window=window_index, rows=rows, num_output_maps=num_output_maps,
+                                outputs=outputs, force=rows == region.rows)
+
+        if pool is not None:
+            pool.terminate()
+        for entry in outputs:
+            entry.close_window()
+        num_blocks += len(blocks) + len(probe)
+
+    if skip_null:
+        gcore.message(_("Skipped the UDF for %i of %i blocks (%.1f%%) with only null cells")
+                      % (num_skipped, num_blocks, 100.0 * num_skipped / max(num_blocks, 1)))
+
+    if runner is not None:
+        runner.report(num_blocks=num_blocks)
+    if service is not None:
+        service.close()
+
+    handles.close()
+    if maxopen > 0:
+        gcore.verbose(_("Input raster maps were opened %i times with at most %i open maps")
+                      % (handles.num_opened, maxopen))
+
+    num_output_maps = sum(len(entry.map_ids) for entry in outputs)
+    if not raster_only:
+        with profiler.stage("register", rows=num_output_maps):
+            for entry in outputs:
+                register_output_maps(output=entry.name, input_strds=input_strds,
+                                     map_ids=entry.map_ids,
+                                     result_start_times=entry.result_start_times, dbif=dbif, print_info=print_info)
+
+    if coordinator:
+        partial_maps = [entry.basename + f"_part{task['id']}" + map_id.split("@")[0][len(entry.basename):]
+                        + "@" + mapsets[task["id"]]
+                        for task in tasks for entry in outputs for map_id in entry.map_ids]
+        gcore.run_command("g.remove", flags="f", type="raster", name=",".join(partial_maps), quiet=True)
 
     dbif.close()
 
+    if checkpoint is not None:
+        checkpoint.clear()
+
+    if profile_file:
+        profiler.write_summary(profile_file, blocks=num_blocks, skipped_blocks=num_skipped,
+                               nrows=nrows, rows=region.rows, cols=region.cols, nprocs=nprocs,
+                               pipeline=pipeline, output_maps=num_output_maps)
+    if trace_file:
+        profiler.write_trace(trace_file)
+
 
 if __name__ == "__main__":
     options, flags = gcore.parser()
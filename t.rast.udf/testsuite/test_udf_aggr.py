@@ -67,6 +67,32 @@ def hyper_sum(data: UdfData):
         self.assertModule("t.rast.list", input="B")
         self.assertRasterMinMax(map="aggr_a", refmin=600, refmax=600, msg="Minimum must be 600")
 
+    def test_helper_function(self):
+        """Helper functions with a single argument are not called as UDF function"""
+        udf_file = open("/tmp/udf_aggr_helper.py", "w")
+        code = """
+def scale(array):
+    return array * 2
+
+
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = scale(cube.array.sum(dim="t"))
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="aggr_helper",
+                          pyfile="/tmp/udf_aggr_helper.py", overwrite=True, nrows=3)
+
+        self.assertRasterMinMax(map="aggr_helper", refmin=1200, refmax=1200, msg="Minimum must be 1200")
+
 
 if __name__ == '__main__':
     from grass.gunittest.main import test
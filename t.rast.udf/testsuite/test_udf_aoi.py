@@ -0,0 +1,112 @@
+"""Test t.rast.udf restricted to an area of interest
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestAreaOfInterest(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        cls.runModule("r.mapcalc", expression="aoi = if(row() == 2 && col() <= 4, 1, null())", overwrite=True)
+        cls.runModule("v.in.ascii", input="-", output="aoi_point", separator="comma", stdin_="35,45",
+                      overwrite=True)
+
+        udf_file = open("/tmp/udf_aoi.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+        cls.runModule("g.remove", flags="f", type="raster", name="aoi")
+        cls.runModule("g.remove", flags="f", type="vector", name="aoi_point")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_bbox(self):
+        """Only the cells of the rows and columns that intersect the bounding box are computed"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                          overwrite=True, nrows=1, bbox="40,20,60,30")
+
+        self.assertRasterMinMax(map="aoi_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="aoi_a", reference={"n": 6, "mean": 600})
+
+    def test_bbox_blocks(self):
+        """All rows of the blocks that intersect the bounding box are computed"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                          overwrite=True, nrows=3, bbox="40,20,60,30", flags="p")
+
+        self.assertRasterFitsUnivar(raster="aoi_a", reference={"n": 9, "mean": 600})
+
+    def test_bbox_partly_outside(self):
+        """Only the cells of the part of the bounding box inside of the region are computed"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                          overwrite=True, nrows=1, bbox="40,20,15,-50")
+
+        self.assertRasterFitsUnivar(raster="aoi_a", reference={"n": 4, "mean": 600})
+
+    def test_bbox_outside(self):
+        """A bounding box west of the region does not intersect it"""
+        self.assertModuleFail("t.rast.udf", inputs="A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                              overwrite=True, nrows=1, bbox="60,20,-30,-50")
+
+    def test_raster(self):
+        """Only the cells of the rows and columns of the non-null cells of the raster map are computed"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                          overwrite=True, nrows=1, aoiraster="aoi", tilecols=2, tilerows=1)
+
+        self.assertRasterFitsUnivar(raster="aoi_a", reference={"n": 4, "mean": 600})
+
+    def test_vector(self):
+        """Only the cell of the point is computed"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="aoi_a", pyfile="/tmp/udf_aoi.py",
+                          overwrite=True, nrows=1, aoi="aoi_point")
+
+        self.assertRasterFitsUnivar(raster="aoi_a", reference={"n": 1, "mean": 600})
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -0,0 +1,163 @@
+"""Test the checkpoint and resume of t.rast.udf
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import shutil
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestCheckpoint(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_checkpoint.py", "w")
+        code = """
+import os
+
+def hyper_sum(data: UdfData):
+    # Simulate an interruption of the job at the last block
+    if os.path.exists("/tmp/udf_checkpoint_fail") and float(data.get_datacube_list()[0].array.y.min()) < 10:
+        raise RuntimeError("Interrupted")
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        udf_file = open("/tmp/udf_checkpoint_window.py", "w")
+        code = """
+import os
+
+def hyper_sum(data: UdfData):
+    # Simulate an interruption of the job in the second window
+    if os.path.exists("/tmp/udf_checkpoint_fail") and float(data.get_datacube_list()[0].array.max()) > 250:
+        raise RuntimeError("Interrupted")
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_resume(self):
+        """Resume an interrupted sum aggregation from the saved rows"""
+        checkpoint = "/tmp/udf_checkpoint"
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        open("/tmp/udf_checkpoint_fail", "w").close()
+
+        self.assertModuleFail("t.rast.udf", inputs="A,A", output="B", basename="checkpoint_a",
+                              pyfile="/tmp/udf_checkpoint.py", overwrite=True, nrows=2, checkpoint=checkpoint,
+                              interval=0)
+        self.assertTrue(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+        self.assertEqual(os.path.getsize(os.path.join(checkpoint, "checkpoint_a.bin")), 6 * 12 * 8)
+
+        os.remove("/tmp/udf_checkpoint_fail")
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="checkpoint_a",
+                          pyfile="/tmp/udf_checkpoint.py", overwrite=True, nrows=2, checkpoint=checkpoint)
+
+        self.assertModule("t.rast.list", input="B")
+        self.assertRasterMinMax(map="checkpoint_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="checkpoint_a", reference={"n": 96, "mean": 600})
+        self.assertFalse(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+    def test_other_mtype(self):
+        """A checkpoint is not resumed with another output map type"""
+        checkpoint = "/tmp/udf_checkpoint_mtype"
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        open("/tmp/udf_checkpoint_fail", "w").close()
+
+        self.assertModuleFail("t.rast.udf", inputs="A,A", output="B", basename="checkpoint_b",
+                              pyfile="/tmp/udf_checkpoint.py", overwrite=True, nrows=2, checkpoint=checkpoint,
+                              interval=0)
+        self.assertTrue(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+        os.remove("/tmp/udf_checkpoint_fail")
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="checkpoint_b",
+                          pyfile="/tmp/udf_checkpoint.py", overwrite=True, nrows=2, checkpoint=checkpoint,
+                          mtype="FCELL")
+
+        self.assertRasterFitsUnivar(raster="checkpoint_b", reference={"n": 96, "mean": 600})
+        self.assertFalse(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+    def test_interval(self):
+        """No manifest is saved within the interval after the start of the job"""
+        checkpoint = "/tmp/udf_checkpoint_interval"
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        open("/tmp/udf_checkpoint_fail", "w").close()
+
+        self.assertModuleFail("t.rast.udf", inputs="A,A", output="B", basename="checkpoint_c",
+                              pyfile="/tmp/udf_checkpoint.py", overwrite=True, nrows=2, checkpoint=checkpoint,
+                              interval=3600)
+        os.remove("/tmp/udf_checkpoint_fail")
+        self.assertFalse(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+    def test_completed_window(self):
+        """A completed window is saved within the interval and not recomputed"""
+        checkpoint = "/tmp/udf_checkpoint_window"
+        shutil.rmtree(checkpoint, ignore_errors=True)
+        open("/tmp/udf_checkpoint_fail", "w").close()
+
+        self.assertModuleFail("t.rast.udf", inputs="A", output="B", basename="checkpoint_d",
+                              pyfile="/tmp/udf_checkpoint_window.py", overwrite=True, nrows=2, window=2, step=1,
+                              checkpoint=checkpoint, interval=3600, flags="n")
+        self.assertTrue(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+        os.remove("/tmp/udf_checkpoint_fail")
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="checkpoint_d",
+                          pyfile="/tmp/udf_checkpoint_window.py", overwrite=True, nrows=2, window=2, step=1,
+                          checkpoint=checkpoint, flags="n")
+
+        self.assertRasterFitsUnivar(raster="checkpoint_d_0", reference={"n": 96, "mean": 300})
+        self.assertRasterFitsUnivar(raster="checkpoint_d_1", reference={"n": 96, "mean": 500})
+        self.assertFalse(os.path.exists(os.path.join(checkpoint, "manifest.json")))
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -0,0 +1,95 @@
+"""Test the coordinator and workers of t.rast.udf
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import grass.script as gcore
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestCoordinator(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_coordinator.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_sum_workers(self):
+        """Sum aggregation of row ranges processed by local workers"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="coordinator_a",
+                          pyfile="/tmp/udf_coordinator.py", overwrite=True, nrows=1,
+                          coordinator="localhost:0", workers=2, taskrows=3)
+
+        self.assertModule("t.rast.list", input="B")
+        self.assertRasterMinMax(map="coordinator_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="coordinator_a", reference={"n": 96, "mean": 600})
+        self.assertFalse(gcore.list_grouped("raster", pattern="coordinator_a_part*")[gcore.gisenv()["MAPSET"]])
+
+    def test_bbox_workers(self):
+        """Row ranges outside of the bounding box are not processed by the workers"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="coordinator_b",
+                          pyfile="/tmp/udf_coordinator.py", overwrite=True, nrows=1, bbox="40,20,60,30",
+                          coordinator="localhost:0", workers=2, taskrows=2)
+
+        self.assertRasterFitsUnivar(raster="coordinator_b", reference={"n": 6, "mean": 600})
+        self.assertFalse(gcore.list_grouped("raster", pattern="coordinator_b_part*")[gcore.gisenv()["MAPSET"]])
+
+    def test_window_workers(self):
+        """Sum of temporal windows of row ranges processed by local workers"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="coordinator_w",
+                          pyfile="/tmp/udf_coordinator.py", overwrite=True, nrows=2, window=2,
+                          coordinator="localhost:0", workers=3, flags="p")
+
+        self.assertRasterFitsUnivar(raster="coordinator_w_0", reference={"n": 96, "mean": 300})
+        self.assertRasterFitsUnivar(raster="coordinator_w_1", reference={"n": 96, "mean": 500})
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -0,0 +1,95 @@
+"""Test the memory budget of t.rast.udf
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import json
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestMemoryBudget(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+
+        A row of the three DCELL maps of A needs 3 * 1024 * 8 bytes
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=64, w=0, e=1024, b=0, t=50, res=1, res3=1)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_memory.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_memory(self):
+        """The input and result cubes of a block of 21 rows fit into 1 MB"""
+        profile = "/tmp/udf_memory_profile.json"
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="memory_a", pyfile="/tmp/udf_memory.py",
+                          overwrite=True, memory=1, profile=profile)
+
+        with open(profile) as profile_file:
+            summary = json.load(profile_file)
+        self.assertEqual(summary["nrows"], 21)
+        self.assertEqual(summary["blocks"], 4)
+
+        self.assertRasterMinMax(map="memory_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="memory_a", reference={"n": 65536, "mean": 600})
+
+    def test_memory_nprocs(self):
+        """The blocks in flight of the worker processes share the memory budget"""
+        profile = "/tmp/udf_memory_nprocs_profile.json"
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="memory_b", pyfile="/tmp/udf_memory.py",
+                          overwrite=True, memory=1, nprocs=2, profile=profile)
+
+        with open(profile) as profile_file:
+            summary = json.load(profile_file)
+        self.assertEqual(summary["nrows"], 4)
+        self.assertEqual(summary["blocks"], 16)
+
+        self.assertRasterFitsUnivar(raster="memory_b", reference={"n": 65536, "mean": 600})
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -0,0 +1,80 @@
+"""Test t.rast.udf writing several resulting data cubes
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import grass.temporal as tgis
+import grass.script as gcore
+from grass.gunittest.case import TestCase
+
+
+class TestMultipleOutputs(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_outputs.py", "w")
+        code = """
+def hyper_sum_max(data: UdfData):
+    cube = data.get_datacube_list()[0]
+    total = cube.array.sum(dim="t")
+    total.name = cube.id + "_sum"
+    maximum = cube.array.max(dim="t")
+    maximum.name = cube.id + "_max"
+    data.set_datacube_list([DataCube(array=total), DataCube(array=maximum)])
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B,C")
+
+    def test_sum_max_outputs(self):
+        """The sum and the max cube are written into their own output STRDS"""
+        self.assertModule("t.rast.udf", inputs="A", output="B,C", basename="outputs_sum,outputs_max",
+                          pyfile="/tmp/udf_outputs.py", overwrite=True, nrows=3)
+
+        self.assertRasterMinMax(map="outputs_sum", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="outputs_sum", reference={"n": 96, "mean": 600})
+        self.assertRasterMinMax(map="outputs_max", refmin=300, refmax=300, msg="Minimum must be 300")
+        self.assertRasterFitsUnivar(raster="outputs_max", reference={"n": 96, "mean": 300})
+
+        sum_maps = gcore.read_command("t.rast.list", input="B", columns="name", flags="u").split()
+        max_maps = gcore.read_command("t.rast.list", input="C", columns="name", flags="u").split()
+        self.assertEqual(sum_maps, ["outputs_sum"])
+        self.assertEqual(max_maps, ["outputs_max"])
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
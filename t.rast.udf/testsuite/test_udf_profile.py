@@ -0,0 +1,96 @@
+"""Test the profile and trace of the processing stages of t.rast.udf
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import json
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestProfile(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_profile.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_profile_trace(self):
+        """The stages of all blocks are summarized in the profile and recorded in the trace"""
+        profile = "/tmp/udf_profile.json"
+        trace = "/tmp/udf_trace.json"
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="profile_a", pyfile="/tmp/udf_profile.py",
+                          overwrite=True, nrows=3, profile=profile, trace=trace)
+
+        self.assertRasterFitsUnivar(raster="profile_a", reference={"n": 96, "mean": 600})
+
+        with open(profile) as profile_file:
+            summary = json.load(profile_file)
+        self.assertEqual(summary["nrows"], 3)
+        self.assertEqual(summary["blocks"], 3)
+        self.assertEqual(summary["rows"], 8)
+        self.assertEqual(summary["output_maps"], 1)
+
+        stages = summary["stages"]
+        for name in ("read", "udf", "write"):
+            self.assertEqual(stages[name]["calls"], 3)
+            self.assertEqual(stages[name]["rows"], 8)
+        self.assertEqual(stages["register"]["calls"], 1)
+        self.assertEqual(stages["register"]["rows"], 1)
+        self.assertGreater(stages["read"]["bytes"], 0)
+
+        with open(trace) as trace_file:
+            events = json.load(trace_file)["traceEvents"]
+        names = set(event["name"] for event in events)
+        self.assertTrue({"read", "udf", "write", "register"}.issubset(names))
+        self.assertEqual(sum(event["args"]["rows"] for event in events if event["name"] == "write"), 8)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
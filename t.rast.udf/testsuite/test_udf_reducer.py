@@ -0,0 +1,206 @@
+"""Test the built-in reducers of t.rast.udf against the UDF path
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import time
+import grass.temporal as tgis
+import grass.script as gcore
+from grass.gunittest.case import TestCase
+
+UDF_CODE = """
+def hyper_reduce(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        result = cube.array.%s(dim="t")
+        result.name = cube.id + "_%s"
+        cube_list.append(DataCube(array=result))
+    data.set_datacube_list(cube_list)
+    return data
+"""
+
+
+CELL_UDF_CODE = """
+def hyper_reduce(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        result = cube.array.where(cube.array != -2147483648).%s(dim="t")
+        result.name = cube.id + "_%s"
+        cube_list.append(DataCube(array=result))
+    data.set_datacube_list(cube_list)
+    return data
+"""
+
+
+def write_cell_udf(reducer):
+    """Write the UDF that masks the null cells of CELL cubes and reduces the time axis"""
+    filename = "/tmp/udf_reducer_cell_%s.py" % reducer
+    with open(filename, "w") as udf_file:
+        udf_file.write(CELL_UDF_CODE % (reducer, reducer))
+    return filename
+
+
+def write_udf(reducer):
+    """Write the UDF that reduces the time axis like the built-in reducer"""
+    filename = "/tmp/udf_reducer_%s.py" % reducer
+    with open(filename, "w") as udf_file:
+        udf_file.write(UDF_CODE % (reducer, reducer))
+    return filename
+
+
+class TestReducer(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = row() * 1.5", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = col() * 2.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = if(row() > 4, row() + col() + 0.5, null())", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        cls.runModule("r.mapcalc", expression="i1 = row() * 3", overwrite=True)
+        cls.runModule("r.mapcalc", expression="i2 = if(col() > 6, col() * 2, null())", overwrite=True)
+        cls.runModule("r.mapcalc", expression="i3 = if(row() > 4, row() + col(), null())", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="I", title="I test",
+                      description="I test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="I", maps="i1,i2,i3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A,I")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B,C")
+
+    def assertReducerEqualsUdf(self, reducer):
+        """Compare the result of a built-in reducer with the result of the UDF"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="reducer_udf",
+                          pyfile=write_udf(reducer), overwrite=True, nrows=3)
+        self.assertModule("t.rast.udf", inputs="A", output="C", basename="reducer_native",
+                          reducer=reducer, overwrite=True, nrows=3)
+
+        self.assertModule("t.rast.list", input="C")
+        self.assertRastersNoDifference(actual="reducer_native", reference="reducer_udf", precision=1e-6)
+
+    def assertCellReducerEqualsUdf(self, reducer):
+        """Compare the result of a built-in reducer on CELL maps with nulls with a UDF that masks the nulls"""
+        self.assertModule("t.rast.udf", inputs="I", output="B", basename="reducer_cell_udf",
+                          pyfile=write_cell_udf(reducer), overwrite=True, nrows=3)
+        self.assertModule("t.rast.udf", inputs="I", output="C", basename="reducer_cell_native",
+                          reducer=reducer, overwrite=True, nrows=3)
+
+        self.assertRastersNoDifference(actual="reducer_cell_native", reference="reducer_cell_udf", precision=0)
+
+    def test_sum(self):
+        self.assertReducerEqualsUdf("sum")
+
+    def test_mean(self):
+        self.assertReducerEqualsUdf("mean")
+
+    def test_max(self):
+        self.assertReducerEqualsUdf("max")
+
+    def test_min(self):
+        self.assertReducerEqualsUdf("min")
+
+    def test_median(self):
+        self.assertReducerEqualsUdf("median")
+
+    def test_cell_max(self):
+        self.assertCellReducerEqualsUdf("max")
+
+    def test_cell_min(self):
+        self.assertCellReducerEqualsUdf("min")
+
+    def test_cell_nulls(self):
+        """The null cells of CELL maps are skipped and not reduced as values"""
+        self.assertModule("t.rast.udf", inputs="I", output="C", basename="reducer_cell_min",
+                          reducer="min", overwrite=True, nrows=3)
+        self.assertRasterMinMax(map="reducer_cell_min", refmin=3, refmax=20, msg="Null cells must be skipped")
+
+    def test_two_outputs(self):
+        """The reducer writes the result of each input strds into its own output strds"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B,C", basename="reducer_b,reducer_c",
+                          reducer="max", overwrite=True, nrows=3, flags="p")
+
+        self.assertRasterFitsUnivar(raster="reducer_b", reference={"n": 96, "max": 24})
+        self.assertRastersNoDifference(actual="reducer_c", reference="reducer_b", precision=0)
+
+    def test_pyfile_and_reducer(self):
+        """The reducer and a UDF can not be used together"""
+        self.assertModuleFail("t.rast.udf", inputs="A", output="B", basename="reducer_b",
+                              pyfile=write_udf("sum"), reducer="sum", overwrite=True)
+
+
+class BenchmarkReducer(TestCase):
+    """Compare the run time of the built-in reducer with the UDF path on a larger region"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=400, w=0, e=600, res=1)
+        maps = []
+        for count in range(10):
+            name = "bench_%i" % count
+            cls.runModule("r.mapcalc", expression="%s = rand(0, 100.0)" % name, seed=count, overwrite=True)
+            maps.append(name)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="BENCH", title="Benchmark",
+                      description="Benchmark", overwrite=True)
+        cls.runModule("t.register", flags="i", type="raster", input="BENCH", maps=",".join(maps),
+                      start="2001-01-01", increment="1 day", overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="BENCH,B,C")
+
+    def test_benchmark_mean(self):
+        """Time the mean reduction of both paths, the results must be equal"""
+        start = time.perf_counter()
+        self.assertModule("t.rast.udf", inputs="BENCH", output="B", basename="bench_udf",
+                          pyfile=write_udf("mean"), overwrite=True, nrows=50)
+        udf_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        self.assertModule("t.rast.udf", inputs="BENCH", output="C", basename="bench_native",
+                          reducer="mean", overwrite=True, nrows=50)
+        reducer_seconds = time.perf_counter() - start
+
+        gcore.message("Mean of 10 maps with 240000 cells: UDF %.3f s, reducer %.3f s"
+                      % (udf_seconds, reducer_seconds))
+        self.assertRastersNoDifference(actual="bench_native", reference="bench_udf", precision=1e-6)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
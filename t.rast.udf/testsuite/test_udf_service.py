@@ -0,0 +1,122 @@
+"""Test t.rast.udf with the UDF service
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import subprocess
+import time
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestUdfService(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_service.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        cls.address = "/tmp/udf_service.sock"
+        cls.service = subprocess.Popen(["t.rast.udf", "-s", "service=%s" % cls.address])
+        for _ in range(100):
+            if os.path.exists(cls.address):
+                break
+            time.sleep(0.1)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.service.terminate()
+        cls.service.wait()
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_sum_service(self):
+        """Sum aggregation computed by the UDF service"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="service_a", pyfile="/tmp/udf_service.py",
+                          overwrite=True, nrows=3, service=self.address)
+
+        self.assertModule("t.rast.list", input="B")
+        self.assertRasterMinMax(map="service_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="service_a", reference={"n": 96, "mean": 600})
+
+    def test_sum_service_pipeline(self):
+        """Sum aggregation computed by the UDF service with a pipeline and a second job"""
+        for count in range(2):
+            self.assertModule("t.rast.udf", inputs="A", output="B", basename="service_a",
+                              pyfile="/tmp/udf_service.py", overwrite=True, nrows=2, flags="p",
+                              service=self.address)
+            self.assertRasterFitsUnivar(raster="service_a", reference={"n": 96, "mean": 600})
+
+    def test_pass_service(self):
+        """The time coordinates of resulting cubes with time axis are returned by the service"""
+        udf_file = open("/tmp/udf_service_pass.py", "w")
+        code = """
+def hyper_pass(data: UdfData):
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="service_pass",
+                          pyfile="/tmp/udf_service_pass.py", overwrite=True, nrows=3, service=self.address)
+
+        self.assertRasterFitsUnivar(raster="service_pass_2", reference={"n": 96, "mean": 300})
+        self.assertModule("t.rast.list", input="B")
+
+    def test_second_service(self):
+        """A service is not started at the socket of a running service"""
+        self.assertModuleFail("t.rast.udf", flags="s", service=self.address)
+        self.assertTrue(os.path.exists(self.address))
+
+    def test_sum_fallback(self):
+        """Sum aggregation in process if the UDF service is not running"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="service_b", pyfile="/tmp/udf_service.py",
+                          overwrite=True, nrows=3, service="/tmp/udf_no_service.sock")
+
+        self.assertRasterFitsUnivar(raster="service_b", reference={"n": 96, "mean": 600})
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
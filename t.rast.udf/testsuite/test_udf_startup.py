@@ -0,0 +1,102 @@
+"""Test the startup time of t.rast.udf with python -X importtime
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import shutil
+import subprocess
+import sys
+import grass.temporal as tgis
+import grass.script as gcore
+from grass.gunittest.case import TestCase
+
+# The modules that are only needed to run the UDF in process
+UDF_MODULES = {"pandas", "xarray", "openeo_udf"}
+# The modules that are never needed
+UNUSED_MODULES = {"geopandas", "shapely"}
+
+
+def module_script():
+    """Return the path of the installed module or of its source file"""
+    script = shutil.which("t.rast.udf")
+    if script is None:
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "t.rast.udf.py")
+    return script
+
+
+def import_times(*args):
+    """Run t.rast.udf with python -X importtime
+
+    :return: A dictionary of the cumulative import time in microseconds of the imported top level packages
+    """
+    process = subprocess.run([sys.executable, "-X", "importtime", module_script()] + list(args),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if not fields[1].strip().isdigit():
+            continue
+        package = fields[2].strip().split(".")[0]
+        times[package] = max(times.get(package, 0), int(fields[1]))
+    return times
+
+
+class TestStartup(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_interface_description(self):
+        """Parsing the options does not import the UDF modules"""
+        times = import_times("--interface-description")
+        gcore.message("Import time of the interface description: %.3f s" % (sum(times.values()) / 1e6))
+
+        self.assertFalse(UDF_MODULES & set(times), msg="UDF modules imported: %s" % (UDF_MODULES & set(times)))
+        self.assertFalse(UNUSED_MODULES & set(times))
+
+    def test_reducer(self):
+        """The reducer path does not import the UDF modules"""
+        times = import_times("inputs=A", "output=B", "basename=startup_b", "reducer=sum", "--overwrite")
+        gcore.message("Import time of the reducer path: %.3f s" % (sum(times.values()) / 1e6))
+
+        self.assertRasterFitsUnivar(raster="startup_b", reference={"n": 96, "mean": 300})
+        self.assertFalse(UDF_MODULES & set(times), msg="UDF modules imported: %s" % (UDF_MODULES & set(times)))
+        self.assertFalse(UNUSED_MODULES & set(times))
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
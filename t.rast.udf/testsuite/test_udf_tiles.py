@@ -0,0 +1,144 @@
+"""Test t.rast.udf in tile mode
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestTileProcessing(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="x_coords = x()", overwrite=True)
+        cls.runModule("r.mapcalc", expression="y_coords = y()", overwrite=True)
+        cls.runModule("r.mapcalc", expression="v1 = row() * 1000.0 + col()", overwrite=True)
+        cls.runModule("r.mapcalc", expression="v2 = row() * 2000.0 + col()", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="V", title="V test",
+                      description="V test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="V", maps="v1,v2",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A,V")
+        cls.runModule("g.remove", flags="f", type="raster", name="x_coords,y_coords")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_sum_tiles(self):
+        """Sum aggregation with tiles that do not divide the region"""
+        udf_file = open("/tmp/udf_tiles_sum.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="tiles_a", pyfile="/tmp/udf_tiles_sum.py",
+                          overwrite=True, tilecols=5, tilerows=3)
+
+        self.assertRasterMinMax(map="tiles_a", refmin=600, refmax=600, msg="Minimum must be 600")
+        self.assertRasterFitsUnivar(raster="tiles_a", reference={"n": 96, "mean": 600})
+
+    def test_x_coordinates_tiles(self):
+        """The x coordinates of the tiles must match the cell centers of the region"""
+        udf_file = open("/tmp/udf_tiles_x.py", "w")
+        code = """
+def hyper_x(data: UdfData):
+    cube = data.get_datacube_list()[0]
+    result = cube.array.isel(t=0) * 0 + cube.array.x
+    result.name = cube.id + "_x"
+    data.set_datacube_list([DataCube(array=result.transpose("y", "x"))])
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="tiles_x", pyfile="/tmp/udf_tiles_x.py",
+                          overwrite=True, tilecols=5)
+
+        self.assertRastersNoDifference(actual="tiles_x", reference="x_coords", precision=0.001)
+
+    def test_y_coordinates_tiles(self):
+        """The y coordinates of the tiles must match the cell centers of the region"""
+        udf_file = open("/tmp/udf_tiles_y.py", "w")
+        code = """
+def hyper_y(data: UdfData):
+    cube = data.get_datacube_list()[0]
+    result = cube.array.isel(t=0) * 0 + cube.array.y
+    result.name = cube.id + "_y"
+    data.set_datacube_list([DataCube(array=result.transpose("y", "x"))])
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="tiles_y", pyfile="/tmp/udf_tiles_y.py",
+                          overwrite=True, tilecols=5, tilerows=3)
+
+        self.assertRastersNoDifference(actual="tiles_y", reference="y_coords", precision=0.001)
+
+    def test_values_tiles(self):
+        """The tiles copied from the band buffer hold the values of their cells"""
+        udf_file = open("/tmp/udf_tiles_pass.py", "w")
+        code = """
+def hyper_pass(data: UdfData):
+    cube = data.get_datacube_list()[0]
+    result = cube.array.isel(t=1)
+    result.name = cube.id + "_pass"
+    data.set_datacube_list([DataCube(array=result)])
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        self.assertModule("t.rast.udf", inputs="V", output="B", basename="tiles_pass", pyfile="/tmp/udf_tiles_pass.py",
+                          overwrite=True, tilecols=5, tilerows=3, maxopen=1)
+
+        self.assertRastersNoDifference(actual="tiles_pass", reference="v2", precision=0.001)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
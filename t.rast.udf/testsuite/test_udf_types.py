@@ -0,0 +1,135 @@
+"""Test the map types of the data cubes and output maps of t.rast.udf
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestMapTypes(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        cls.runModule("r.mapcalc", expression="n1 = if(row() > 4, 100.0, null())", overwrite=True)
+        cls.runModule("r.mapcalc", expression="n2 = 200.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="N", title="N test",
+                      description="N test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="N", maps="n1,n2",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        cls.runModule("r.mapcalc", expression="c1 = if(row() > 4, 100, null())", overwrite=True)
+        cls.runModule("r.mapcalc", expression="c2 = 200", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="C", title="C test",
+                      description="C test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="C", maps="c1,c2",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_types_first.py", "w")
+        code = """
+def hyper_first(data: UdfData):
+    cube = data.get_datacube_list()[0]
+    first = cube.array.isel(t=0)
+    first.name = cube.id + "_first"
+    data.set_datacube_list([DataCube(array=first)])
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+        udf_file = open("/tmp/udf_types.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        if str(cube.array.dtype) != "float32":
+            raise TypeError("The cube has the type " + str(cube.array.dtype))
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A,N,C")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_fcell_cubes(self):
+        """DCELL maps are computed as FCELL cubes and written as DCELL maps"""
+        self.assertModule("t.rast.udf", inputs="A,A", output="B", basename="types_a", pyfile="/tmp/udf_types.py",
+                          overwrite=True, nrows=3, ctype="FCELL", mtype="DCELL")
+
+        self.assertRasterFitsUnivar(raster="types_a", reference={"n": 96, "mean": 600})
+        self.assertModuleKeyValue("r.info", map="types_a", flags="g", reference={"datatype": "DCELL"}, sep="=")
+
+    def test_cell_output(self):
+        """FCELL cubes are written as CELL maps"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="types_a", pyfile="/tmp/udf_types.py",
+                          overwrite=True, nrows=3, ctype="FCELL", mtype="CELL")
+
+        self.assertRasterFitsUnivar(raster="types_a", reference={"n": 96, "mean": 600})
+        self.assertModuleKeyValue("r.info", map="types_a", flags="g", reference={"datatype": "CELL"}, sep="=")
+
+    def test_cell_output_nulls(self):
+        """The NaN cells of float results are written as null cells of CELL maps"""
+        self.assertModule("t.rast.udf", inputs="N", output="B", basename="types_n", pyfile="/tmp/udf_types_first.py",
+                          overwrite=True, nrows=3, mtype="CELL")
+
+        self.assertRasterFitsUnivar(raster="types_n", reference={"n": 48, "null_cells": 48, "mean": 100})
+        self.assertModuleKeyValue("r.info", map="types_n", flags="g", reference={"datatype": "CELL"}, sep="=")
+
+    def test_fcell_output_nulls(self):
+        """The null cells of CELL cubes are written as null cells of FCELL maps"""
+        self.assertModule("t.rast.udf", inputs="C", output="B", basename="types_c", pyfile="/tmp/udf_types_first.py",
+                          overwrite=True, nrows=3, mtype="FCELL")
+
+        self.assertRasterFitsUnivar(raster="types_c", reference={"n": 48, "null_cells": 48, "mean": 100})
+        self.assertModuleKeyValue("r.info", map="types_c", flags="g", reference={"datatype": "FCELL"}, sep="=")
+
+    def test_dcell_cubes(self):
+        """The UDF fails for cubes of the map type of the DCELL maps"""
+        self.assertModuleFail("t.rast.udf", inputs="A", output="B", basename="types_a", pyfile="/tmp/udf_types.py",
+                              overwrite=True, nrows=3)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()
@@ -0,0 +1,89 @@
+"""Test t.rast.udf with temporal sliding windows
+
+(C) 2020 by the GRASS Development Team
+This program is free software under the GNU General Public
+License (>=v2). Read the file COPYING that comes with GRASS
+for details.
+
+:authors: Soeren Gebbert
+"""
+import os
+from datetime import datetime
+import grass.temporal as tgis
+from grass.gunittest.case import TestCase
+
+
+class TestSlidingWindow(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        """Initiate the temporal GIS and set the region
+        """
+        os.putenv("GRASS_OVERWRITE", "1")
+        tgis.init()
+        cls.use_temp_region()
+        cls.runModule("g.region", s=0, n=80, w=0, e=120, b=0, t=50, res=10, res3=10)
+        cls.runModule("r.mapcalc", expression="a1 = 100.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a2 = 200.0", overwrite=True)
+        cls.runModule("r.mapcalc", expression="a3 = 300.0", overwrite=True)
+
+        cls.runModule("t.create", type="strds", temporaltype="absolute", output="A", title="A test",
+                      description="A test", overwrite=True)
+
+        cls.runModule("t.register", flags="i", type="raster", input="A", maps="a1,a2,a3",
+                      start="2001-01-01", increment="2 days", overwrite=True)
+
+        udf_file = open("/tmp/udf_window.py", "w")
+        code = """
+def hyper_sum(data: UdfData):
+    cube_list = []
+    for cube in data.get_datacube_list():
+        mean = cube.array.sum(dim="t")
+        mean.name = cube.id + "_sum"
+        cube_list.append(DataCube(array=mean))
+    data.set_datacube_list(cube_list)
+    return data
+
+        """
+        udf_file.write(code)
+        udf_file.close()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Remove the temporary region
+        """
+        cls.del_temp_region()
+        cls.runModule("t.remove", flags="rf", type="strds", inputs="A")
+
+    def tearDown(self):
+        """Remove generated data"""
+        self.runModule("t.remove", flags="rf", type="strds", inputs="B")
+
+    def test_sum_window(self):
+        """Sum of the windows of two maps, moved one map forward"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="window", pyfile="/tmp/udf_window.py",
+                          overwrite=True, nrows=3, window=2, step=1)
+
+        self.assertModule("t.rast.list", input="B")
+        self.assertRasterFitsUnivar(raster="window_0", reference={"n": 96, "mean": 300})
+        self.assertRasterFitsUnivar(raster="window_1", reference={"n": 96, "mean": 500})
+
+        maps = tgis.open_old_stds("B", "strds").get_registered_maps_as_objects(order="start_time")
+        self.assertEqual(len(maps), 2)
+        self.assertEqual(maps[0].get_absolute_time()[0], datetime(2001, 1, 1))
+        self.assertEqual(maps[1].get_absolute_time()[0], datetime(2001, 1, 3))
+
+    def test_mean_window_step(self):
+        """Mean of the windows of two maps with the reducer, the last map is not processed"""
+        self.assertModule("t.rast.udf", inputs="A", output="B", basename="window", reducer="mean",
+                          overwrite=True, nrows=3, window=2, step=2)
+
+        self.assertRasterFitsUnivar(raster="window_0", reference={"n": 96, "mean": 150})
+        maps = tgis.open_old_stds("B", "strds").get_registered_maps_as_objects(order="start_time")
+        self.assertEqual(len(maps), 1)
+
+
+if __name__ == '__main__':
+    from grass.gunittest.main import test
+
+    test()